@@ -10,7 +10,13 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
+from datetime import timedelta
 from pathlib import Path
+from os import getenv
+
+from dotenv import load_dotenv
+
+load_dotenv()
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -57,6 +63,7 @@ MIDDLEWARE = [
 	'debug_toolbar.middleware.DebugToolbarMiddleware',
 
 	'django.middleware.security.SecurityMiddleware',
+	'shared.db.read_replica.ReadReplicaStickinessMiddleware',
 	'django.contrib.sessions.middleware.SessionMiddleware',
 	'django.middleware.common.CommonMiddleware',
 	'django.middleware.csrf.CsrfViewMiddleware',
@@ -92,9 +99,39 @@ DATABASES = {
 	'default': {
 		'ENGINE': 'django.db.backends.sqlite3',
 		'NAME': BASE_DIR / 'db.sqlite3',
+		'CONN_MAX_AGE': 60, # Постоянные соединения - PRAGMA выполняются один раз на соединение
+		'CONN_HEALTH_CHECKS': True,
+		'OPTIONS': {
+			# Блокировка на запись берётся сразу в начале транзакции - без "database is locked"
+			# при попытке повысить блокировку чтения до записи
+			'transaction_mode': 'IMMEDIATE',
+			# На каждом новом соединении: читатели не блокируют писателя (WAL), ожидание
+			# блокировки до 5 с, один fsync на checkpoint, кэш страниц ~20 МиБ, mmap 128 МиБ
+			'init_command': (
+				'PRAGMA journal_mode = WAL;'
+				'PRAGMA busy_timeout = 5000;'
+				'PRAGMA synchronous = NORMAL;'
+				'PRAGMA cache_size = -20000;'
+				'PRAGMA mmap_size = 134217728;'
+			),
+		},
 	}
 }
 
+# Реплика для чтения (см. shared.db.read_replica). Локально - копия файла, которую
+# обновляет manage.py sync_replica --interval 1
+if replica_name := getenv('DATABASE_REPLICA_NAME'):
+	DATABASES['replica'] = {
+		**DATABASES['default'],
+		'NAME': BASE_DIR / replica_name,
+		'TEST': {'MIRROR': 'default'},
+	}
+
+DATABASE_ROUTERS = ['shared.db.read_replica.ReadReplicaRouter']
+READ_REPLICA_DATABASE = 'replica'
+READ_REPLICA_APPS = {'content'} # Чтение моделей этих приложений - с реплики
+READ_REPLICA_STICKINESS = 5 # сек. - после записи клиент читает с основной базы
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -152,12 +189,20 @@ LOGGING = {
 		},
 	},
 
+	'filters': {
+		# Токены телеграм ботов не должны попадать в логи (в т.ч. в URL из логов urllib3)
+		'redact_telegram_tokens': {
+			'()': 'applications.telegram.TelegramTokenRedactingFilter',
+		},
+	},
+
 	'handlers': {
 		# Вывод в консоль для всех приложений
 		'console': {
 			'level': 'DEBUG',
 			'class': 'logging.StreamHandler',
-			'formatter': 'simple'
+			'formatter': 'simple',
+			'filters': ['redact_telegram_tokens'],
 		},
 		
 		# Файл ошибок для всех приложений
@@ -165,7 +210,8 @@ LOGGING = {
 			'level': 'ERROR',
 			'class': 'logging.FileHandler',
 			'filename': BASE_DIR / 'all_errors.log',
-			'formatter': 'simple'
+			'formatter': 'simple',
+			'filters': ['redact_telegram_tokens'],
 		},
 	},
 
@@ -178,3 +224,63 @@ LOGGING = {
 
 # MARK: Libs
 PHONENUMBER_DEFAULT_REGION = "RU" # Код страны (ISO 3166-1 alpha-2)
+PHONENUMBER_DB_FORMAT = "E164" # Один формат в БД - поиск повторов заявок по индексу
+
+# MARK: This proj
+# Адрес сайта (схема + хост) для robots.txt и sitemap.xml, по умолчанию - из запроса
+SITE_BASE_URL = getenv('SITE_BASE_URL')
+# Фоновая отправка уведомлений о заявках в Telegram
+TELEGRAM_NOTIFICATIONS_WORKERS = 2
+TELEGRAM_NOTIFICATIONS_QUEUE_SIZE = 100
+TELEGRAM_NOTIFICATIONS_FANOUT_WORKERS = 8 # Параллельных отправок в разные чаты
+# Bot API (в тестах - заглушка applications.testing.FakeTelegramAPIServer)
+TELEGRAM_API_BASE_URL = getenv('TELEGRAM_API_BASE_URL', 'https://api.telegram.org')
+TELEGRAM_API_TIMEOUT = (3.05, 10) # (подключение, чтение), сек.
+TELEGRAM_API_MAX_RETRIES = 2
+TELEGRAM_API_POOL_SIZE = 4
+# Лимиты Bot API: сообщений/сек на бота, сообщений/мин в группу, сообщений/сек в личный чат
+TELEGRAM_API_BOT_RATE = 30
+TELEGRAM_API_GROUP_RATE_PER_MINUTE = 20
+TELEGRAM_API_PRIVATE_RATE = 1
+TELEGRAM_API_MAX_WAIT = 30 # Дольше ждать своей очереди не стоит - отправка откладывается в outbox
+# Circuit breaker бота: после стольких ошибок подряд отправка через бота приостанавливается на указанное время
+TELEGRAM_CIRCUIT_BREAKER_FAILURE_THRESHOLD = 5
+TELEGRAM_CIRCUIT_BREAKER_RECOVERY_TIME = timedelta(minutes = 1)
+# Повторные попытки (manage.py send_notifications)
+TELEGRAM_NOTIFICATIONS_MAX_ATTEMPTS = 8
+TELEGRAM_NOTIFICATIONS_BACKOFF_BASE = timedelta(seconds = 30)
+TELEGRAM_NOTIFICATIONS_BACKOFF_MAX = timedelta(hours = 1)
+TELEGRAM_NOTIFICATIONS_LEASE = timedelta(minutes = 2)
+# Нет бота или чата для уведомлений - следующая проверка через это время (попытка не засчитывается)
+TELEGRAM_NOTIFICATIONS_NOT_CONFIGURED_RETRY = timedelta(minutes = 5)
+
+# Повторная заявка с тем же номером за это время помечается как повтор (без уведомления)
+APPLICATIONS_DUPLICATE_WINDOW = timedelta(days = 1)
+# Повторная отправка формы заявки с тем же ключом в течение этого времени (сек.) игнорируется.
+# Ключи хранятся в кэше Django - при нескольких процессах нужен общий кэш (Redis, БД)
+APPLICATIONS_IDEMPOTENCY_TTL = 10 * 60
+# Не больше (N заявок, за период в сек.) с одного IP и на один номер телефона, сверх - ответ 429
+APPLICATIONS_THROTTLE_PER_IP = (10, 60)
+APPLICATIONS_THROTTLE_PER_PHONE = (3, 10 * 60)
+APPLICATIONS_THROTTLE_BACKEND = 'memory' # 'cache' - общий для процессов лимит через кэш Django
+APPLICATIONS_THROTTLE_IP_HEADER = None # За reverse proxy: заголовок с IP клиента, например 'HTTP_X_REAL_IP'
+# Group commit: заявки из формы сохраняются пачками (см. applications.writing)
+APPLICATIONS_GROUP_COMMIT = False
+APPLICATIONS_GROUP_COMMIT_MAX_BATCH = 50
+APPLICATIONS_GROUP_COMMIT_MAX_DELAY = 0.02 # сек.
+APPLICATIONS_GROUP_COMMIT_TIMEOUT = 2 # сек. ожидания пачки, дольше - заявка сохраняется сразу
+
+# API массовой загрузки заявок (applications.views.BulkApplicationsView)
+APPLICATIONS_BULK_MAX_ROWS = 1000
+
+# Перенос старых заявок в архив (manage.py archive_applications)
+APPLICATIONS_RETENTION = timedelta(days = 365) # Заявки старше - переносятся в ArchivedApplication
+APPLICATIONS_ARCHIVE_CHUNK_SIZE = 500 # Заявок за одну транзакцию
+
+# Экспорт из админки: в Excel - не больше стольких заявок, больше - в CSV (отдаётся потоком)
+APPLICATIONS_EXPORT_EXCEL_MAX_ROWS = 10_000
+
+# Автодополнение населённого пункта (applications.settlements)
+APPLICATIONS_SETTLEMENTS_FILE = None # Справочник: текстовый файл, по населённому пункту на строку
+APPLICATIONS_SETTLEMENTS_INDEX_TTL = 60 * 60 # сек. - полная пересборка индекса
+APPLICATIONS_SETTLEMENTS_MIN_WEIGHT = 3 # Введённый в заявках пункт виден в подсказках с этого количества заявок
@@ -22,6 +22,7 @@ from django.conf				import settings
 
 urlpatterns = [
 	path('admin/', admin.site.urls),
+	path('api/applications/', include('applications.urls')),
 	path('', include('content.urls'))
 ] + debug_toolbar_urls()
 
@@ -1,16 +1,23 @@
 import logging
 from os import getenv
 
-from django.contrib.admin	import StackedInline, ModelAdmin, action
+from django.conf 				import settings
+from django.contrib.admin	import StackedInline, ModelAdmin, SimpleListFilter, EmptyFieldListFilter, action
+from django.contrib 			import messages
+from django.db.models 		import Sum
 from django.http 			import HttpResponse
 from django.utils 			import timezone
 
 from rangefilter.filters import DateRangeFilter
 
 from applications.apps 		import ApplicationsConfig
-from applications 			import models
-from shared.admin.exporting import export_to_excel
-from shared.admin 			import AdminModelRegistrator, make_singleton_model_admin_class
+from applications 			import models, throttling, search
+from applications.bot_pool 	import bot_pool
+from applications.notifications import requeue_notifications
+from shared.admin.exporting import export_to_excel, export_to_csv
+from shared.admin 			import AdminModelRegistrator, KeysetPaginationMixin, CachedCountMixin, make_singleton_model_admin_class
+from shared.resilience 		import CircuitState
+from shared.db.read_replica import get_read_database
 
 
 registrator = AdminModelRegistrator(
@@ -19,40 +26,225 @@ registrator = AdminModelRegistrator(
 )
 
 
+_EXPORT_FIELDS = ('requestener_name', 'phone_number', 'settlement', 'date')
+
+def _export_to_excel(modeladmin, request, queryset, name: str) -> HttpResponse | None:
+	# Excel собирается целиком до ответа - большие выгрузки только в CSV, который отдаётся потоком
+	max_rows = getattr(settings, 'APPLICATIONS_EXPORT_EXCEL_MAX_ROWS', 10_000)
+	if queryset.count() > max_rows:
+		modeladmin.message_user(request,
+			f"Для Excel выбрано больше {max_rows} заявок, используйте экспорт в CSV", level = messages.WARNING)
+		return None
+	return export_to_excel(queryset, name, fields = _EXPORT_FIELDS)
+
 @action(description = 'Экспортировать выбранное в Exсel')
-def export_selected_to_exel(modeladmin, request, queryset) -> HttpResponse:
+def export_selected_to_exel(modeladmin, request, queryset) -> HttpResponse | None:
 	name = f"Экспорт заявок {timezone.now().strftime("%d.%m.%Y")}"
 
-	return export_to_excel(
-		queryset, name,
-		fields = ('requestener_name', 'phone_number', 'settlement', 'date'),
-	)
+	# Экспорт - долгое чтение, которому не нужны самые свежие данные
+	return _export_to_excel(modeladmin, request, queryset.using(get_read_database()), name)
+
+@action(description = 'Экспортировать выбранное в CSV (для больших выгрузок)')
+def export_selected_to_csv(modeladmin, request, queryset) -> HttpResponse:
+	name = f"Экспорт заявок {timezone.now().strftime("%d.%m.%Y")}"
+	return export_to_csv(queryset.using(get_read_database()), name, fields = _EXPORT_FIELDS)
+
+class DeliveryStatusFilter(SimpleListFilter):
+	title = "Уведомление"
+	parameter_name = 'delivery'
+
+	def lookups(self, request, model_admin):
+		return (
+			('delivered', "Доставлено"),
+			('undelivered', "Не доставлено"),
+			('dead', "Не удалось отправить"),
+		)
+
+	def queryset(self, request, queryset):
+		not_sent = models.ApplicationNotification.objects.exclude(status = models.ApplicationNotification.Status.SENT)
+		if self.value() == 'delivered':
+			return queryset.filter(notifications__isnull = False).exclude(notifications__in = not_sent).distinct()
+		if self.value() == 'undelivered':
+			return queryset.filter(notifications__in = not_sent).distinct()
+		if self.value() == 'dead':
+			return queryset.filter(notifications__status = models.ApplicationNotification.Status.DEAD).distinct()
+		return queryset
 
 @registrator.set_for_model(models.Application)
-class ApplicationAdmin(ModelAdmin):
+class ApplicationAdmin(KeysetPaginationMixin, CachedCountMixin, ModelAdmin):
 	readonly_fields = ('date',)
-	list_display = ('application', 'phone_number', 'settlement', 'date')
+	list_display = ('application', 'phone_number', 'settlement', 'date', 'is_duplicate')
 	list_max_show_all = 100
 	list_filter = (
 		('date', DateRangeFilter),
+		DeliveryStatusFilter,
+		('duplicate_of', EmptyFieldListFilter),
 	)
+	raw_id_fields = ('duplicate_of', )
+	# Поиск - по индексу FTS5 (см. get_search_results), поля нужны для вывода строки поиска
+	search_fields = ('requestener_name', 'settlement', 'phone_number')
+	search_help_text = "Имя, населённый пункт или номер телефона в любом формате, можно начало слова"
 	sortable_by = ('date', )
-	ordering = ('-date', )
-	actions = [export_selected_to_exel]
+	ordering = ('-date', '-id')
+	# Страницы по (date, id) вместо OFFSET - индекс application_date_idx
+	keyset_pagination_field = 'date'
+	actions = [export_selected_to_exel, export_selected_to_csv]
+
+	def get_total_count(self) -> int:
+		return models.ApplicationsCounter.get_total()
+
+	def get_search_results(self, request, queryset, search_term):
+		return search.filter_applications(queryset, search_term), False
+
+	def changelist_view(self, request, extra_context = None):
+		rejected = throttling.get_rejected_counts()
+		if any(rejected.values()):
+			self.message_user(request,
+				f"Отклонено отправок формы из-за лимитов (этот процесс): по IP - {rejected['ip']}, "
+				f"по номеру телефона - {rejected['phone']}", level = messages.WARNING)
+		return super().changelist_view(request, extra_context)
 
 	def application(self, obj: models.Application) -> str:
 		return obj.requestener_name
 	application.short_description = "Заявка от"
 
+	def is_duplicate(self, obj: models.Application) -> bool:
+		return obj.duplicate_of_id is not None
+	is_duplicate.short_description = "Повтор"
+	is_duplicate.boolean = True
+
+
+@action(description = 'Экспортировать выбранное в Exсel')
+def export_selected_archived_to_exel(modeladmin, request, queryset) -> HttpResponse | None:
+	name = f"Архив заявок {timezone.now().strftime("%d.%m.%Y")}"
+	return _export_to_excel(modeladmin, request, queryset.using(get_read_database()), name)
+
+@action(description = 'Экспортировать выбранное в CSV (для больших выгрузок)')
+def export_selected_archived_to_csv(modeladmin, request, queryset) -> HttpResponse:
+	name = f"Архив заявок {timezone.now().strftime("%d.%m.%Y")}"
+	return export_to_csv(queryset.using(get_read_database()), name, fields = _EXPORT_FIELDS)
+
+@registrator.set_for_model(models.ArchivedApplication)
+class ArchivedApplicationAdmin(ModelAdmin):
+	list_display = ('__str__', 'phone_number', 'settlement', 'date', 'is_duplicate', 'archived_at')
+	list_filter = (('date', DateRangeFilter), 'is_duplicate')
+	search_fields = ('requestener_name', 'phone_number', 'settlement')
+	ordering = ('-date', '-id')
+	show_full_result_count = False
+	actions = [export_selected_archived_to_exel, export_selected_archived_to_csv]
+
+	def has_add_permission(self, request) -> bool:
+		return False
+
+	def has_change_permission(self, request, obj = None) -> bool:
+		return False
+
+
+@registrator.set_for_model(models.ApplicationDailySummary)
+class ApplicationDailySummaryAdmin(ModelAdmin):
+	"""Сводка по дням: список строк сводки и итоги по выбранным фильтрам - без запросов к таблице заявок."""
+	list_display = ('day', 'settlement', 'count')
+	list_filter = (('day', DateRangeFilter), )
+	search_fields = ('settlement', )
+	ordering = ('-day', 'settlement')
+	list_per_page = 50
+	dashboard_size = 31
+
+	def has_add_permission(self, request) -> bool:
+		return False
+
+	def has_change_permission(self, request, obj = None) -> bool:
+		return False
+
+	def changelist_view(self, request, extra_context = None):
+		response = super().changelist_view(request, extra_context)
+		if not hasattr(response, 'context_data') or 'cl' not in response.context_data:
+			return response
+
+		queryset = response.context_data['cl'].queryset.order_by()
+		response.context_data['summary_total'] = queryset.aggregate(total = Sum('count'))['total'] or 0
+		response.context_data['summary_by_settlement'] = (
+			queryset.values('settlement').annotate(total = Sum('count')).order_by('-total')[:self.dashboard_size])
+		response.context_data['summary_by_day'] = (
+			queryset.values('day').annotate(total = Sum('count')).order_by('-day')[:self.dashboard_size])
+		return response
+
+
+@action(description = 'Повторить отправку')
+def requeue_selected_notifications(modeladmin, request, queryset):
+	requeued = requeue_notifications(queryset)
+	modeladmin.message_user(request, f"Возвращено в очередь: {requeued}")
+
+@registrator.set_for_model(models.ApplicationNotification)
+class ApplicationNotificationAdmin(ModelAdmin):
+	list_display = ('__str__', 'application', 'status', 'attempts', 'created_at', 'next_attempt_at', 'sent_at', 'delivery_time')
+	list_filter = ('status', )
+	list_select_related = ('application', )
+	readonly_fields = ('application', 'created_at', 'sent_at', 'telegram_message_id', 'delivery_time', 'last_error')
+	ordering = ('-created_at', )
+	actions = [requeue_selected_notifications]
+
+	def has_add_permission(self, request) -> bool:
+		return False
+
 
 @registrator.set_for_model(models.TelegramBot)
 class TelegrammBotAdmin(ModelAdmin):
-	readonly_fields = ('token_success', )
-	list_display = ('__str__', 'token_success')
+	readonly_fields = ('token_success', 'circuit_state', 'rate_limit_metrics')
+	list_display = ('__str__', 'use_for_notifications', 'token_success', 'circuit_state', 'rate_limit_metrics')
 
 	def token_success(self, obj: models.TelegramBot) -> bool:
 		return getenv(obj.token_env_variable_name) is not None
 	token_success.short_description = "Токен найден"
 	token_success.boolean = True
 
+	_CIRCUIT_STATE_NAMES = {
+		CircuitState.CLOSED: "работает",
+		CircuitState.OPEN: "приостановлен",
+		CircuitState.HALF_OPEN: "пробная отправка",
+	}
+	def circuit_state(self, obj: models.TelegramBot) -> str:
+		if obj.pk is None:
+			return '-'
+
+		state, retry_after = bot_pool.get_circuit_state(obj)
+		if state is CircuitState.OPEN:
+			return f"{self._CIRCUIT_STATE_NAMES[state]} (ещё {retry_after:.0f} с)"
+		return self._CIRCUIT_STATE_NAMES[state]
+	circuit_state.short_description = "Состояние (этот процесс)"
+
+	def rate_limit_metrics(self, obj: models.TelegramBot) -> str:
+		client = obj.get_client()
+		if client is None:
+			return '-'
+
+		metrics = client.rate_limiter.metrics()
+		return (
+			f"ждут: {metrics['waiting']}, ждали: {metrics['waits']} раз "
+			f"(в среднем {metrics['avg_wait_seconds']} с, максимум {metrics['max_wait_seconds']} с), "
+			f"отложено: {metrics['deferred']}, 429 от Telegram: {metrics['throttled_by_api']}"
+		)
+	rate_limit_metrics.short_description = "Лимиты отправки (этот процесс)"
+
+@registrator.set_for_model(models.IntegrationPartner)
+class IntegrationPartnerAdmin(ModelAdmin):
+	list_display = ('__str__', 'is_active', 'token_success')
+	readonly_fields = ('token_success', )
+
+	def token_success(self, obj: models.IntegrationPartner) -> bool:
+		return getenv(obj.token_env_variable_name) is not None
+	token_success.short_description = "Токен найден"
+	token_success.boolean = True
+
+registrator.exclude_model(models.NotificationRoute)
+registrator.exclude_model(models.ApplicationsCounter)
+class NotificationRoutesInline(StackedInline):
+	model = models.NotificationRoute
+	can_delete = True
+	extra = 0
+
+@registrator.set_for_model(models.TelegrammBotSendingSettings)
+class TelegrammBotSendingSettingsAdmin(make_singleton_model_admin_class(models.TelegrammBotSendingSettings)):
+	inlines = [NotificationRoutesInline]
+
 registrator.register()
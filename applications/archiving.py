@@ -0,0 +1,118 @@
+"""
+Архив заявок
+------------
+Заявки старше `APPLICATIONS_RETENTION` переносятся из `Application` в `ArchivedApplication`
+(см. `manage.py archive_applications`), чтобы таблица заявок, с которой работают админка,
+фильтры и экспорт, оставалась небольшой. Архив доступен в админке: поиск, фильтр по дате, экспорт.
+
+Перенос идёт пачками по `APPLICATIONS_ARCHIVE_CHUNK_SIZE` заявок, каждая - отдельной короткой
+транзакцией, поэтому блокировка на запись не держится долго и новые заявки сохраняются
+между пачками.
+"""
+
+from datetime 	import datetime, timedelta
+from typing 	import Callable
+import time
+
+from django.conf 	import settings
+from django.db 		import transaction
+from django.db.models 	import QuerySet
+from django.utils 	import timezone
+
+from applications.models import Application, ApplicationNotification, ArchivedApplication, ApplicationsCounter
+
+
+def get_archive_cutoff() -> datetime:
+	"""Заявки до этого момента подлежат переносу в архив."""
+	return timezone.now() - getattr(settings, 'APPLICATIONS_RETENTION', timedelta(days = 365))
+
+def _delete_without_signals(queryset: QuerySet) -> int:
+	"""
+	Удаляет строки одним DELETE - без Collector, каскадов и сигналов `post_delete` (связанные
+	строки удаляются заранее, счётчики обновляются вызывающим кодом).
+
+	`QuerySet._raw_delete(using)` - закрытый API Django, проверено на Django 5.2
+	(возвращает количество удалённых строк). При обновлении Django - проверить.
+	"""
+	return queryset._raw_delete(queryset.db)
+
+def _archive_chunk(cutoff: datetime, chunk_size: int) -> int:
+	with transaction.atomic():
+		# Самые старые заявки - по индексу application_date_idx. Заявка, у которой есть ещё
+		# не подлежащие переносу повторы, ждёт их (не дольше APPLICATIONS_DUPLICATE_WINDOW) -
+		# иначе повторы в таблице заявок потеряли бы ссылку и выглядели бы как первичные
+		applications = list(
+			Application.objects
+			.filter(date__lt = cutoff)
+			.exclude(duplicates__date__gte = cutoff)
+			.order_by('date', 'id')
+			[:chunk_size]
+		)
+		if not applications:
+			return 0
+
+		# Повторы этих заявок, которые тоже подлежат переносу - в той же пачке, иначе
+		# ссылка на перенесённую заявку сотрётся раньше, чем повтор попадёт в архив
+		applications += Application.objects.filter(
+			duplicate_of_id__in = [application.pk for application in applications],
+			date__lt = cutoff,
+		).exclude(pk__in = [application.pk for application in applications])
+		ids = [application.pk for application in applications]
+		# ignore_conflicts - если пачка уже была скопирована, но не удалена (например, прерванный перенос)
+		ArchivedApplication.objects.bulk_create([
+			ArchivedApplication(
+				original_id = application.pk,
+				requestener_name = application.requestener_name,
+				settlement = application.settlement,
+				phone_number = application.phone_number,
+				date = application.date,
+				is_duplicate = application.duplicate_of_id is not None,
+			)
+			for application in applications
+		], ignore_conflicts = True)
+
+		# Без post_delete на каждую заявку: счётчик заявок уменьшается одним запросом,
+		# сводка по дням (applications.summary) не меняется - перенесённые заявки в ней учитываются
+		_delete_without_signals(ApplicationNotification.objects.filter(application_id__in = ids))
+		deleted = _delete_without_signals(Application.objects.filter(pk__in = ids))
+		ApplicationsCounter.add(-deleted)
+	return deleted
+
+def archive_applications(
+		cutoff: datetime | None = None,
+		*,
+		chunk_size: int | None = None,
+		pause: float = 0,
+		limit: int | None = None,
+		on_chunk: Callable[[int], None] | None = None) -> int:
+	"""
+	Переносит заявки старше `cutoff` в архив.
+
+	Args:
+		cutoff: По умолчанию - `get_archive_cutoff()`.
+		chunk_size: Заявок за одну транзакцию (и их повторы), по умолчанию - `APPLICATIONS_ARCHIVE_CHUNK_SIZE`.
+		pause: Пауза между пачками, сек.
+		limit: Остановиться, когда перенесено столько заявок (может быть превышено на повторы из последней пачки).
+		on_chunk: Вызывается после каждой пачки с количеством перенесённых в ней заявок.
+
+	Returns:
+		Сколько заявок перенесено.
+	"""
+	cutoff = cutoff or get_archive_cutoff()
+	chunk_size = chunk_size or getattr(settings, 'APPLICATIONS_ARCHIVE_CHUNK_SIZE', 500)
+	if chunk_size < 1:
+		raise ValueError("Chunk size cannot be less 1")
+
+	archived = 0
+	while limit is None or archived < limit:
+		size = chunk_size if limit is None else min(chunk_size, limit - archived)
+		moved = _archive_chunk(cutoff, size)
+		if not moved:
+			break
+
+		archived += moved
+		if on_chunk:
+			on_chunk(moved)
+		if pause:
+			time.sleep(pause)
+	return archived
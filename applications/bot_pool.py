@@ -0,0 +1,140 @@
+"""
+Распределение отправки уведомлений между несколькими ботами
+-----------------------------------------------------------
+Каждый бот ограничен своими лимитами Bot API, поэтому при включённом
+`TelegrammBotSendingSettings.use_bot_pool` сообщения распределяются между всеми ботами
+с `use_for_notifications`: выбирается наименее загруженный (меньше всего отправок в
+процессе), при равенстве - по кругу.
+
+У каждого бота свой circuit breaker (`shared.resilience.CircuitBreaker`): после
+`TELEGRAM_CIRCUIT_BREAKER_FAILURE_THRESHOLD` ошибок подряд (или если не найден токен)
+бот не используется `TELEGRAM_CIRCUIT_BREAKER_RECOVERY_TIME`, затем одна пробная отправка
+решает, вернуть ли его в работу. Если все боты недоступны - `acquire` сразу выбрасывает
+`BotsUnavailableError`, и уведомления откладываются в outbox, не дожидаясь таймаутов.
+Состояние пула хранится в памяти процесса.
+"""
+
+from datetime 	import timedelta
+from itertools 	import count
+from threading 	import Lock
+import logging
+
+from django.conf import settings
+
+from applications.models 	import TelegramBot, TelegrammBotSendingSettings
+from applications.telegram 	import TelegramBotClient
+from shared.resilience 		import CircuitBreaker, CircuitState
+
+
+_logger = logging.getLogger(__name__)
+
+
+class BotsUnavailableError(Exception):
+	"""
+	Нет ни одного доступного бота.
+
+	Attributes:
+		retry_after: Через сколько секунд может появиться доступный бот (`None` - неизвестно).
+	"""
+	def __init__(self, message: str, *, retry_after: float | None = None):
+		super().__init__(message)
+		self.retry_after: float | None = retry_after
+
+
+class _BotState:
+	def __init__(self, breaker: CircuitBreaker):
+		self.in_flight: int = 0
+		self.breaker: CircuitBreaker = breaker
+
+
+class BotPool:
+	def __init__(self, *, failure_threshold: int | None = None, recovery_time: timedelta | None = None):
+		self._failure_threshold: int = failure_threshold or getattr(settings, 'TELEGRAM_CIRCUIT_BREAKER_FAILURE_THRESHOLD', 5)
+		self._recovery_time: float = (
+			recovery_time or getattr(settings, 'TELEGRAM_CIRCUIT_BREAKER_RECOVERY_TIME', timedelta(minutes = 1))
+		).total_seconds()
+
+		self._states: dict[int, _BotState] = {}
+		self._round_robin = count()
+		self._lock = Lock()
+
+	def _get_state(self, bot: TelegramBot) -> _BotState:
+		if bot.pk not in self._states:
+			self._states[bot.pk] = _BotState(CircuitBreaker(
+				failure_threshold = self._failure_threshold,
+				recovery_timeout = self._recovery_time,
+			))
+		return self._states[bot.pk]
+
+	def get_circuit_state(self, bot: TelegramBot) -> tuple[CircuitState, float]:
+		"""Returns: (состояние circuit breaker бота, через сколько секунд он снова попробует отправку)"""
+		with self._lock:
+			breaker = self._get_state(bot).breaker
+		return breaker.state, breaker.retry_after
+
+	def acquire(self, bots: list[TelegramBot]) -> tuple[TelegramBot, TelegramBotClient]:
+		"""
+		Выбирает наименее загруженного доступного бота. После отправки обязательно вызовите `release`.
+
+		Raises:
+			BotsUnavailableError: Нет ни одного доступного бота.
+		"""
+		with self._lock:
+			candidates: list[tuple[TelegramBot, TelegramBotClient, _BotState]] = []
+			for bot in bots:
+				state = self._get_state(bot)
+				if state.breaker.state is CircuitState.OPEN:
+					continue
+
+				client = bot.get_client()
+				if client is None:
+					_logger.error(f"{bot} исключён из пула: токен не найден в {bot.token_env_variable_name}")
+					state.breaker.trip()
+					continue
+
+				candidates.append((bot, client, state))
+
+			# Сначала наименее загруженные, при равенстве - по кругу
+			offset = next(self._round_robin)
+			candidates = [candidates[(offset + i) % len(candidates)] for i in range(len(candidates))]
+			candidates.sort(key = lambda candidate: candidate[2].in_flight)
+
+			for bot, client, state in candidates:
+				# В HALF_OPEN пробная отправка может быть уже занята другим потоком
+				if state.breaker.allow_request():
+					state.in_flight += 1
+					return bot, client
+
+			# Не меньше секунды: пробная отправка может быть занята, но так и не завершиться
+			retry_after = max(min((self._get_state(bot).breaker.retry_after for bot in bots), default = 0), 1)
+			raise BotsUnavailableError("Нет доступных ботов для отправки уведомлений", retry_after = retry_after)
+
+	def release(self, bot: TelegramBot, *, success: bool):
+		with self._lock:
+			state = self._get_state(bot)
+			state.in_flight -= 1
+
+		if success:
+			state.breaker.record_success()
+			return
+
+		state.breaker.record_failure()
+		if state.breaker.state is CircuitState.OPEN:
+			_logger.error(f"{bot}: отправка приостановлена на {self._recovery_time:.0f} с после ошибок")
+
+
+def get_notification_bots(sending_settings: TelegrammBotSendingSettings) -> list[TelegramBot]:
+	"""Боты, через которые отправляются уведомления: пул (если включён) и основной бот."""
+	bots: list[TelegramBot] = []
+	if sending_settings.bot_for_notifications:
+		bots.append(sending_settings.bot_for_notifications)
+
+	if sending_settings.use_bot_pool:
+		bots.extend(
+			bot for bot in TelegramBot.objects.filter(use_for_notifications = True).order_by('pk')
+			if bot not in bots
+		)
+	return bots
+
+
+bot_pool = BotPool()
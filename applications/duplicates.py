@@ -0,0 +1,50 @@
+"""
+Повторные заявки
+----------------
+Посетители часто отправляют форму несколько раз. Заявка с номером телефона, с которого
+уже была заявка за последние `APPLICATIONS_DUPLICATE_WINDOW`, помечается как повтор
+(`Application.duplicate_of`), уведомление о ней не отправляется.
+
+Номера хранятся в E.164 (`PHONENUMBER_DB_FORMAT`), поиск идёт по индексу
+(phone_number, date) - одним запросом на всю пачку заявок.
+"""
+
+from datetime import timedelta
+
+from django.conf 	import settings
+from django.utils 	import timezone
+
+from applications.models import Application
+
+
+_WINDOW: timedelta = getattr(settings, 'APPLICATIONS_DUPLICATE_WINDOW', timedelta(days = 1))
+
+
+def mark_duplicates(applications: list[Application]) -> tuple[list[Application], list[Application]]:
+	"""
+	Заполняет `duplicate_of` у ещё не сохранённых заявок. Повтором считается и заявка,
+	номер которой уже встречался раньше в этой же пачке.
+
+	Returns:
+		(первичные заявки, повторы). Повторы нужно сохранять после первичных - они
+		могут ссылаться на заявки из той же пачки.
+	"""
+	phone_numbers = {str(application.phone_number) for application in applications}
+	originals_by_phone: dict[str, Application] = {}
+	for application in (
+			Application.objects
+			.filter(phone_number__in = phone_numbers, date__gte = timezone.now() - _WINDOW, duplicate_of__isnull = True)
+			.order_by('-date')):
+		originals_by_phone.setdefault(str(application.phone_number), application)
+
+	originals: list[Application] = []
+	duplicates: list[Application] = []
+	for application in applications:
+		phone_number = str(application.phone_number)
+		if original := originals_by_phone.get(phone_number):
+			application.duplicate_of = original
+			duplicates.append(application)
+		else:
+			originals_by_phone[phone_number] = application
+			originals.append(application)
+	return originals, duplicates
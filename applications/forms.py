@@ -1,7 +1,47 @@
-from django.forms import ModelForm
-from applications.models import Application
+from uuid import uuid4
+
+from django.conf 		import settings
+from django.core.cache 	import cache
+from django.forms 		import ModelForm, CharField, HiddenInput, TextInput
+
+from applications.models 		import Application
+from applications.settlements 	import normalize_settlement
+
 
 class ApplicationForm(ModelForm):
+	# Выдаётся вместе с формой, повторная отправка формы с тем же ключом (двойной клик,
+	# "назад" + отправить) не создаёт новую заявку. См. claim_submission.
+	idempotency_key = CharField(widget = HiddenInput, required = False, max_length = 64, initial = lambda: uuid4().hex)
+
 	class Meta:
 		model = Application
-		fields = '__all__'
+		fields = ('requestener_name', 'settlement', 'phone_number')
+		widgets = {
+			# Подсказки - <datalist> из /api/applications/settlements (см. content/index.html)
+			'settlement': TextInput(attrs = {'list': 'settlement-suggestions', 'autocomplete': 'off'}),
+		}
+
+	def clean_settlement(self) -> str:
+		# Как ввёл посетитель, только пробелы и регистр - см. applications.settlements
+		return normalize_settlement(self.cleaned_data['settlement'])
+
+	def _get_idempotency_cache_key(self) -> str | None:
+		key = self.cleaned_data.get('idempotency_key')
+		return f"application-form:{key}" if key else None
+
+	def claim_submission(self) -> bool:
+		"""
+		Отмечает отправку формы с этим ключом (в кэше, на `APPLICATIONS_IDEMPOTENCY_TTL`).
+
+		Returns:
+			`False` - форма с этим ключом уже отправлялась, сохранять заявку не нужно.
+		"""
+		cache_key = self._get_idempotency_cache_key()
+		if cache_key is None:
+			return True
+		return cache.add(cache_key, True, getattr(settings, 'APPLICATIONS_IDEMPOTENCY_TTL', 10 * 60))
+
+	def release_submission(self):
+		"""Снимает отметку, если сохранить заявку не удалось - чтобы форму можно было отправить снова."""
+		if cache_key := self._get_idempotency_cache_key():
+			cache.delete(cache_key)
@@ -0,0 +1,46 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from applications.archiving import archive_applications, get_archive_cutoff
+from applications.models 	import Application
+
+
+class Command(BaseCommand):
+	help = (
+		"Переносит заявки старше APPLICATIONS_RETENTION в архив (ArchivedApplication) "
+		"пачками по APPLICATIONS_ARCHIVE_CHUNK_SIZE, каждая - отдельной транзакцией."
+	)
+
+	def add_arguments(self, parser):
+		parser.add_argument('--days', type = float, default = None,
+			help = "Переносить заявки старше стольких дней (по умолчанию - APPLICATIONS_RETENTION).")
+		parser.add_argument('--chunk-size', type = int, default = None,
+			help = "Заявок за одну транзакцию.")
+		parser.add_argument('--pause', type = float, default = 0.05,
+			help = "Пауза между пачками, сек. - чтобы не мешать сохранению новых заявок.")
+		parser.add_argument('--limit', type = int, default = None,
+			help = "Перенести не больше стольких заявок.")
+		parser.add_argument('--dry-run', action = 'store_true',
+			help = "Только показать, сколько заявок будет перенесено.")
+
+	def handle(self, *args, days: float | None, chunk_size: int | None, pause: float, limit: int | None, dry_run: bool, **options):
+		if chunk_size is not None and chunk_size < 1:
+			raise CommandError("--chunk-size не может быть меньше 1")
+
+		cutoff = timezone.now() - timedelta(days = days) if days is not None else get_archive_cutoff()
+		self.stdout.write(f"Заявки до {timezone.localtime(cutoff):%d.%m.%Y %H:%M}")
+
+		if dry_run:
+			self.stdout.write(f"Будет перенесено: {Application.objects.filter(date__lt = cutoff).count()}")
+			return
+
+		archived = archive_applications(
+			cutoff,
+			chunk_size = chunk_size,
+			pause = pause,
+			limit = limit,
+			on_chunk = lambda moved: self.stdout.write(f"  перенесено {moved}"),
+		)
+		self.stdout.write(self.style.SUCCESS(f"Перенесено в архив: {archived}"))
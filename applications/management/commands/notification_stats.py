@@ -0,0 +1,29 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from applications.models 		import ApplicationNotification
+from applications.notifications import get_delivery_stats
+
+
+class Command(BaseCommand):
+	help = "Выводит статистику доставки уведомлений о заявках: статусы и перцентили времени доставки."
+
+	def add_arguments(self, parser):
+		parser.add_argument('--days', type = float, default = 7, help = "За сколько последних дней (0 - за всё время).")
+
+	def handle(self, *args, days: float, **options):
+		since = timezone.now() - timedelta(days = days) if days else None
+		stats = get_delivery_stats(since)
+
+		for status, count in stats['by_status'].items():
+			self.stdout.write(f"{ApplicationNotification.Status(status).label}: {count}")
+
+		if stats['delivery_time'] is None:
+			self.stdout.write("Отправленных уведомлений нет.")
+			return
+
+		self.stdout.write("Время доставки:")
+		for name, delivery_time in stats['delivery_time'].items():
+			self.stdout.write(f"  {name}: {delivery_time.total_seconds():.2f} с")
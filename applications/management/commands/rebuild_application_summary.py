@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from applications.summary import rebuild_summary
+
+
+class Command(BaseCommand):
+	help = "Пересчитывает сводку заявок по дням и населённым пунктам (ApplicationDailySummary) по заявкам и архиву."
+
+	def handle(self, *args, **options):
+		rows = rebuild_summary()
+		self.stdout.write(self.style.SUCCESS(f"Сводка пересчитана, строк: {rows}"))
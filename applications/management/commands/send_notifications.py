@@ -0,0 +1,29 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from applications.notifications import process_due_notifications
+
+
+class Command(BaseCommand):
+	help = "Отправляет уведомления о заявках из outbox, которые не были отправлены сразу."
+
+	def add_arguments(self, parser):
+		parser.add_argument('--batch-size', type = int, default = 50, help = "Уведомлений за одну пачку.")
+		parser.add_argument('--interval', type = float, default = 5,
+			help = "Пауза в секундах, если отправлять нечего.")
+		parser.add_argument('--once', action = 'store_true', help = "Обработать одну пачку и выйти.")
+
+	def handle(self, *args, batch_size: int, interval: float, once: bool, **options):
+		try:
+			while True:
+				processed = process_due_notifications(batch_size)
+				if processed:
+					self.stdout.write(f"Обработано уведомлений: {processed}")
+
+				if once:
+					break
+				if processed < batch_size:
+					time.sleep(interval)
+		except KeyboardInterrupt:
+			self.stdout.write("Остановлено.")
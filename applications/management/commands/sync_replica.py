@@ -0,0 +1,49 @@
+import sqlite3, time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS
+
+
+class Command(BaseCommand):
+	help = (
+		"Копирует основную SQLite базу в реплику для чтения (READ_REPLICA_DATABASE) через "
+		"backup API - замена репликации для локальной проверки чтения с реплики."
+	)
+
+	def add_arguments(self, parser):
+		parser.add_argument('--interval', type = float, default = 0,
+			help = "Повторять копирование каждые N секунд (0 - один раз).")
+		parser.add_argument('--pages', type = int, default = 1024,
+			help = "Страниц за шаг копирования - между шагами основная база доступна для записи.")
+
+	def handle(self, *args, interval: float, pages: int, **options):
+		replica_alias = getattr(settings, 'READ_REPLICA_DATABASE', 'replica')
+		if replica_alias not in settings.DATABASES:
+			raise CommandError(f"В DATABASES нет реплики '{replica_alias}'.")
+
+		primary, replica = settings.DATABASES[DEFAULT_DB_ALIAS], settings.DATABASES[replica_alias]
+		if 'sqlite3' not in primary['ENGINE'] or 'sqlite3' not in replica['ENGINE']:
+			raise CommandError("Поддерживается только SQLite.")
+
+		try:
+			while True:
+				started = time.monotonic()
+				self._copy(primary['NAME'], replica['NAME'], pages)
+				self.stdout.write(f"Реплика обновлена за {time.monotonic() - started:.2f} с")
+
+				if not interval:
+					break
+				time.sleep(interval)
+		except KeyboardInterrupt:
+			self.stdout.write("Остановлено.")
+
+	def _copy(self, source_path, target_path, pages: int):
+		source = sqlite3.connect(source_path)
+		target = sqlite3.connect(target_path, timeout = 30)
+		try:
+			# Копия согласованна: если основную базу изменили во время копирования - backup начнётся заново
+			source.backup(target, pages = pages)
+		finally:
+			target.close()
+			source.close()
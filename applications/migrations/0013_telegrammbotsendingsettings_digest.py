@@ -0,0 +1,33 @@
+# Generated by Django 5.2.4 on 2026-10-19 07:58
+
+import django.core.validators
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('applications', '0012_applicationnotification'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='telegrammbotsendingsettings',
+            name='digest_enabled',
+            field=models.BooleanField(default=False, help_text='Если в чат недавно уже отправлялось уведомление, новые заявки копятся и отправляются одним сообщением. В спокойное время уведомления приходят сразу.', verbose_name='Объединять уведомления при наплыве заявок'),
+        ),
+        migrations.AddField(
+            model_name='telegrammbotsendingsettings',
+            name='digest_max_size',
+            field=models.PositiveSmallIntegerField(default=20, help_text='Если накопилось столько заявок - сообщение отправляется, не дожидаясь конца окна.', validators=[django.core.validators.MinValueValidator(2), django.core.validators.MaxValueValidator(40)], verbose_name='Максимум заявок в одном сообщении'),
+        ),
+        migrations.AddField(
+            model_name='telegrammbotsendingsettings',
+            name='digest_window',
+            field=models.PositiveIntegerField(default=60, help_text='Не чаще одного сообщения в чат за это время, пока идёт наплыв заявок.', validators=[django.core.validators.MinValueValidator(1)], verbose_name='Окно объединения, сек.'),
+        ),
+        migrations.AddIndex(
+            model_name='applicationnotification',
+            index=models.Index(fields=['chat_id', 'status', 'sent_at'], name='notification_chat_sent_idx'),
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.4 on 2026-10-19 08:20
+
+import django.db.models.deletion
+import shared.models.validators
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('applications', '0013_telegrammbotsendingsettings_digest'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='NotificationRoute',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('chat_id', models.CharField(help_text='Либо число, либо отрицательное число для группы, согласно документации telegram.', max_length=64, validators=[shared.models.validators.string_is_correct_numeric_validator], verbose_name='ID чата')),
+                ('settlements', models.TextField(blank=True, help_text='По одному на строку, регистр не важен. Если пусто - в чат приходят все заявки.', verbose_name='Населённые пункты')),
+                ('is_active', models.BooleanField(default=True, verbose_name='Включён')),
+                ('sending_settings', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='routes', to='applications.telegrammbotsendingsettings')),
+            ],
+            options={
+                'verbose_name': 'Маршрут уведомлений',
+                'verbose_name_plural': 'Маршруты уведомлений',
+            },
+        ),
+    ]
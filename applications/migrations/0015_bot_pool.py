@@ -0,0 +1,23 @@
+# Generated by Django 5.2.4 on 2026-10-19 08:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('applications', '0014_notificationroute'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='telegrambot',
+            name='use_for_notifications',
+            field=models.BooleanField(default=False, help_text='Используется, если в настройках Telegram уведомлений включено распределение между ботами.', verbose_name='В пуле ботов для уведомлений'),
+        ),
+        migrations.AddField(
+            model_name='telegrammbotsendingsettings',
+            name='use_bot_pool',
+            field=models.BooleanField(default=False, help_text='Уведомления отправляет наименее загруженный из ботов с отметкой "В пуле ботов для уведомлений" (и основной бот, если задан).', verbose_name='Распределять отправку между ботами'),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.4 on 2026-10-19 09:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('applications', '0015_bot_pool'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='applicationnotification',
+            name='delivery_time',
+            field=models.DurationField(blank=True, help_text='От создания заявки до отправки уведомления.', null=True, verbose_name='Время доставки'),
+        ),
+        migrations.AddField(
+            model_name='applicationnotification',
+            name='telegram_message_id',
+            field=models.BigIntegerField(blank=True, null=True, verbose_name='ID сообщения в Telegram'),
+        ),
+    ]
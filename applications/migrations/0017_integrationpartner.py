@@ -0,0 +1,27 @@
+# Generated by Django 5.2.4 on 2026-10-19 09:40
+
+import shared.models.validators
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('applications', '0016_applicationnotification_delivery'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='IntegrationPartner',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=128, verbose_name='Название')),
+                ('token_env_variable_name', models.CharField(help_text='Партнёр передаёт токен в заголовке "Authorization: Bearer <токен>".', max_length=128, unique=True, validators=[shared.models.validators.env_variable_name_validator], verbose_name='ENV-переменная с токеном')),
+                ('is_active', models.BooleanField(default=True, verbose_name='Доступ разрешён')),
+            ],
+            options={
+                'verbose_name': 'Партнёр (API)',
+                'verbose_name_plural': 'Партнёры (API)',
+            },
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.4 on 2026-10-19 10:05
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('applications', '0017_integrationpartner'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='application',
+            name='duplicate_of',
+            field=models.ForeignKey(blank=True, help_text='Заявка с тем же номером телефона, отправленная ранее. Уведомления о повторах не отправляются.', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='duplicates', to='applications.application', verbose_name='Повтор заявки'),
+        ),
+        migrations.AddIndex(
+            model_name='application',
+            index=models.Index(fields=['phone_number', 'date'], name='application_phone_date_idx'),
+        ),
+    ]
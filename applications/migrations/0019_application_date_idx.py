@@ -0,0 +1,17 @@
+# Generated by Django 5.2.4 on 2026-10-19 11:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('applications', '0018_application_duplicate_of'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='application',
+            index=models.Index(fields=['date', 'id'], name='application_date_idx'),
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 5.2.4 on 2026-10-19 12:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('applications', '0019_application_date_idx'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ApplicationsCounter',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('total', models.PositiveBigIntegerField(default=0, verbose_name='Всего заявок')),
+            ],
+            options={
+                'verbose_name': 'Счётчик заявок',
+                'verbose_name_plural': 'Счётчик заявок',
+            },
+        ),
+    ]
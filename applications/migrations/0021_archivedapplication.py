@@ -0,0 +1,32 @@
+# Generated by Django 5.2.4 on 2026-10-19 09:10
+
+import phonenumber_field.modelfields
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('applications', '0020_applicationscounter'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedApplication',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('original_id', models.PositiveBigIntegerField(editable=False, unique=True, verbose_name='ID заявки')),
+                ('requestener_name', models.CharField(max_length=24, verbose_name='Имя')),
+                ('settlement', models.CharField(max_length=64, verbose_name='Населённый пункт')),
+                ('phone_number', phonenumber_field.modelfields.PhoneNumberField(max_length=128, region=None, verbose_name='Номер телефона')),
+                ('date', models.DateTimeField(verbose_name='Дата заполнения заявки')),
+                ('is_duplicate', models.BooleanField(default=False, verbose_name='Повтор')),
+                ('archived_at', models.DateTimeField(auto_now_add=True, verbose_name='Перенесена в архив')),
+            ],
+            options={
+                'verbose_name': 'Заявка (архив)',
+                'verbose_name_plural': 'Заявки (архив)',
+                'indexes': [models.Index(fields=['date', 'id'], name='archived_application_date_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,56 @@
+# Generated by Django 5.2.4 on 2026-10-19 10:05
+
+from collections import Counter
+
+from django.db import migrations, models
+from django.db.models import Count
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+
+# Только исторические модели: как applications.summary.rebuild_summary, но без импорта
+# текущего кода приложения, который может разойтись со схемой на момент этой миграции
+def fill_summary(apps, schema_editor):
+    ApplicationDailySummary = apps.get_model('applications', 'ApplicationDailySummary')
+
+    counts = Counter()
+    for model_name in ('Application', 'ArchivedApplication'):
+        rows = (
+            apps.get_model('applications', model_name).objects
+            .annotate(day=TruncDate('date', tzinfo=timezone.get_current_timezone()))
+            .values_list('day', 'settlement')
+            .annotate(count=Count('pk'))
+            .order_by()
+        )
+        for day, settlement, count in rows:
+            counts[(day, settlement.strip())] += count
+
+    ApplicationDailySummary.objects.bulk_create([
+        ApplicationDailySummary(day=day, settlement=settlement, count=count)
+        for (day, settlement), count in counts.items()
+    ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('applications', '0021_archivedapplication'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ApplicationDailySummary',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField(verbose_name='День')),
+                ('settlement', models.CharField(max_length=64, verbose_name='Населённый пункт')),
+                ('count', models.PositiveIntegerField(default=0, verbose_name='Заявок')),
+            ],
+            options={
+                'verbose_name': 'Заявки за день',
+                'verbose_name_plural': 'Заявки по дням',
+                'constraints': [models.UniqueConstraint(fields=('day', 'settlement'), name='daily_summary_day_settlement_unique')],
+            },
+        ),
+        migrations.RunPython(fill_summary, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,75 @@
+# Generated by Django 5.2.4 on 2026-10-19 11:20
+
+from django.db import migrations
+
+
+# Полнотекстовый индекс заявок (см. applications.search). Заполняется триггерами,
+# поэтому учитывает и изменения в обход ORM (bulk_create, _raw_delete при переносе в архив).
+# "ё" заменяется на "е" - токенизатор unicode61 не убирает диакритику в кириллице.
+_NAME = "replace(replace({0}.requestener_name, 'ё', 'е'), 'Ё', 'Е')"
+_SETTLEMENT = "replace(replace({0}.settlement, 'ё', 'е'), 'Ё', 'Е')"
+_VALUES = (
+    f"{_NAME}, {_SETTLEMENT}, "
+    # Номер в E.164: целиком без "+" и последние 10 цифр (без кода страны)
+    "ltrim({0}.phone_number, '+'), substr({0}.phone_number, -10)"
+)
+
+_CREATE_SQL = [
+    """
+    CREATE VIRTUAL TABLE applications_application_fts USING fts5(
+        requestener_name, settlement, phone, phone_national,
+        tokenize = 'unicode61 remove_diacritics 2'
+    )
+    """,
+    f"""
+    INSERT INTO applications_application_fts (rowid, requestener_name, settlement, phone, phone_national)
+    SELECT a.id, {_VALUES.format('a')} FROM applications_application a
+    """,
+    f"""
+    CREATE TRIGGER applications_application_fts_insert AFTER INSERT ON applications_application BEGIN
+        INSERT INTO applications_application_fts (rowid, requestener_name, settlement, phone, phone_national)
+        VALUES (new.id, {_VALUES.format('new')});
+    END
+    """,
+    f"""
+    CREATE TRIGGER applications_application_fts_update
+    AFTER UPDATE OF requestener_name, settlement, phone_number ON applications_application BEGIN
+        DELETE FROM applications_application_fts WHERE rowid = old.id;
+        INSERT INTO applications_application_fts (rowid, requestener_name, settlement, phone, phone_national)
+        VALUES (new.id, {_VALUES.format('new')});
+    END
+    """,
+    """
+    CREATE TRIGGER applications_application_fts_delete AFTER DELETE ON applications_application BEGIN
+        DELETE FROM applications_application_fts WHERE rowid = old.id;
+    END
+    """,
+]
+
+_DROP_SQL = [
+    "DROP TRIGGER IF EXISTS applications_application_fts_delete",
+    "DROP TRIGGER IF EXISTS applications_application_fts_update",
+    "DROP TRIGGER IF EXISTS applications_application_fts_insert",
+    "DROP TABLE IF EXISTS applications_application_fts",
+]
+
+
+def _execute(statements: list[str]):
+    def run(apps, schema_editor):
+        # FTS5 есть только в SQLite, в других СУБД поиск работает через LIKE
+        if schema_editor.connection.vendor != 'sqlite':
+            return
+        for statement in statements:
+            schema_editor.execute(statement)
+    return run
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('applications', '0022_applicationdailysummary'),
+    ]
+
+    operations = [
+        migrations.RunPython(_execute(_CREATE_SQL), _execute(_DROP_SQL)),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 5.2.4 on 2026-10-19 13:10
+
+from django.db import migrations
+
+from solo.models import DEFAULT_SINGLETON_INSTANCE_ID
+
+
+# Строка счётчика создаётся здесь, один раз, - а не лениво при первом обращении,
+# когда подсчёт мог разойтись с заявками, созданными параллельно
+def create_counter(apps, schema_editor):
+    ApplicationsCounter = apps.get_model('applications', 'ApplicationsCounter')
+    Application = apps.get_model('applications', 'Application')
+    ApplicationsCounter.objects.update_or_create(
+        pk=DEFAULT_SINGLETON_INSTANCE_ID,
+        defaults={'total': Application.objects.count()},
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('applications', '0023_application_fts'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_counter, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.4 on 2026-10-19 13:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('applications', '0024_fill_applicationscounter'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='applicationnotification',
+            name='chat_id',
+            field=models.CharField(blank=True, help_text='Пусто - при создании заявки чаты не были настроены, чаты выбираются при отправке.', max_length=64, verbose_name='ID чата'),
+        ),
+    ]
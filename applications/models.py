@@ -1,13 +1,18 @@
 from typing import Literal
+from hmac 	import compare_digest
 from os 	import getenv
-import requests, logging
+import logging
 
-from django.db import models
+from django.core.validators 	import MinValueValidator, MaxValueValidator
+from django.db 					import models
+from django.db.models.functions import Greatest
+from django.utils 				import timezone
 
 from phonenumber_field.modelfields 	import PhoneNumberField
 from solo.models 					import SingletonModel
 
-from shared.models.validators import env_variable_name_validator, telegramm_chat_id_validator, string_is_correct_numeric_validator
+from applications.telegram 	import TelegramBotClient, TelegramAPIError, get_client
+from shared.models.validators 	import env_variable_name_validator, telegramm_chat_id_validator, string_is_correct_numeric_validator
 
 
 _logger = logging.getLogger(__name__)
@@ -17,19 +22,89 @@ class Application(models.Model):
 	settlement = models.CharField(verbose_name = "Населённый пункт", max_length = 64)
 	phone_number = PhoneNumberField(verbose_name = "Номер телефона")
 	date = models.DateTimeField(verbose_name = "Дата заполнения заявки",auto_now_add = True, editable = False)
+	duplicate_of = models.ForeignKey('self', on_delete = models.SET_NULL, null = True, blank = True,
+		related_name = 'duplicates', verbose_name = "Повтор заявки",
+		help_text = "Заявка с тем же номером телефона, отправленная ранее. Уведомления о повторах не отправляются.")
 
 	class Meta:
 		verbose_name = 'Заявка'
 		verbose_name_plural = 'Заявки'
+		indexes = [
+			# Сортировка, фильтр по дате и keyset-пагинация в админке
+			models.Index(fields = ('date', 'id'), name = 'application_date_idx'),
+			# Поиск повторов (см. applications.duplicates), номер хранится в E.164
+			models.Index(fields = ('phone_number', 'date'), name = 'application_phone_date_idx'),
+		]
 
 	def __str__(self):
 		return f'{self.requestener_name} {self.phone_number} из {self.settlement}'
 
+class ArchivedApplication(models.Model):
+	"""
+	Заявка, перенесённая из `Application` по сроку хранения (см. `applications.archiving`).
+	Уведомления о заявке при переносе удаляются.
+	"""
+	original_id = models.PositiveBigIntegerField(verbose_name = "ID заявки", unique = True, editable = False)
+	requestener_name = models.CharField(verbose_name = "Имя", max_length = 24)
+	settlement = models.CharField(verbose_name = "Населённый пункт", max_length = 64)
+	phone_number = PhoneNumberField(verbose_name = "Номер телефона")
+	date = models.DateTimeField(verbose_name = "Дата заполнения заявки")
+	is_duplicate = models.BooleanField(verbose_name = "Повтор", default = False)
+	archived_at = models.DateTimeField(verbose_name = "Перенесена в архив", auto_now_add = True)
+
+	class Meta:
+		verbose_name = 'Заявка (архив)'
+		verbose_name_plural = 'Заявки (архив)'
+		indexes = [
+			models.Index(fields = ('date', 'id'), name = 'archived_application_date_idx'),
+		]
+
+	def __str__(self):
+		return f'{self.requestener_name} {self.phone_number} из {self.settlement}'
+
+class ApplicationNotification(models.Model):
+	"""
+	Outbox уведомлений о заявках: запись создаётся в той же транзакции, что и заявка,
+	и удаляется из очереди только после успешной отправки (см. `applications.notifications`).
+	"""
+	class Status(models.TextChoices):
+		PENDING = 'pending', "Ожидает отправки"
+		SENT = 'sent', "Отправлено"
+		DEAD = 'dead', "Не удалось отправить"
+
+	application = models.ForeignKey(Application, on_delete = models.CASCADE, related_name = 'notifications',
+		verbose_name = "Заявка")
+	chat_id = models.CharField(verbose_name = "ID чата", max_length = 64, blank = True,
+		help_text = "Пусто - при создании заявки чаты не были настроены, чаты выбираются при отправке.")
+	status = models.CharField(verbose_name = "Статус", max_length = 16, choices = Status.choices, default = Status.PENDING)
+	attempts = models.PositiveSmallIntegerField(verbose_name = "Попыток отправки", default = 0)
+	next_attempt_at = models.DateTimeField(verbose_name = "Следующая попытка", default = timezone.now)
+	locked_until = models.DateTimeField(verbose_name = "Занято отправкой до", null = True, blank = True, editable = False)
+	last_error = models.TextField(verbose_name = "Последняя ошибка", blank = True)
+	created_at = models.DateTimeField(verbose_name = "Создано", auto_now_add = True)
+	sent_at = models.DateTimeField(verbose_name = "Отправлено", null = True, blank = True)
+	telegram_message_id = models.BigIntegerField(verbose_name = "ID сообщения в Telegram", null = True, blank = True)
+	delivery_time = models.DurationField(verbose_name = "Время доставки", null = True, blank = True,
+		help_text = "От создания заявки до отправки уведомления.")
+
+	class Meta:
+		verbose_name = "Уведомление о заявке"
+		verbose_name_plural = "Уведомления о заявках"
+		indexes = [
+			models.Index(fields = ('status', 'next_attempt_at'), name = 'notification_due_idx'),
+			models.Index(fields = ('chat_id', 'status', 'sent_at'), name = 'notification_chat_sent_idx'),
+		]
+
+	def __str__(self):
+		return f"Уведомление #{self.pk} в {self.chat_id or '(чат не выбран)'}"
+
 class TelegramBot(models.Model):
 	assignment = models.CharField(verbose_name = "Предназначен для", help_text = "Ни на что не влияет", max_length = 512)
 	token_env_variable_name = models.CharField(
 		verbose_name = "ENV-переменная с токеном",
 		unique = True, max_length = 128, validators = [env_variable_name_validator])
+	use_for_notifications = models.BooleanField(default = False, verbose_name = "В пуле ботов для уведомлений",
+		help_text = "Используется, если в настройках Telegram уведомлений включено распределение между ботами.")
 	
 	class Meta:
 		verbose_name = "Телеграм бот"
@@ -37,37 +112,32 @@ class TelegramBot(models.Model):
 	def __str__(self):
 		return f"Телеграм бот для {self.assignment}"
 	
+	def get_client(self) -> TelegramBotClient | None:
+		"""Клиент Bot API этого бота, `None` - если токен не найден в env."""
+		token = getenv(self.token_env_variable_name)
+		if not token:
+			return None
+		return get_client(token)
+
 	def send_telegram_message(self, chat_id: str, text: str, *, parse_mode: Literal["HTML", "MarkdownV2"] | None) -> bool:
 		"""
 		Отправляет сообщение через телеграм бота.
 		Args:
-			token: токен бота
 			chat_id: ID чата в формате числа, либо @chat_id
 			text: Сообщение
 			parse_mode: строка с типом режима парсинга сообщения, согласно документации.
 		Returns:
 			Успешно или нет.
 		"""
-		token = getenv(self.token_env_variable_name)
-		if not token:
+		client = self.get_client()
+		if client is None:
+			_logger.error(f"Токен для {self} не найден в ENV-переменной {self.token_env_variable_name}")
 			return False
 
-		url = f"https://api.telegram.org/bot{token}/sendMessage"
-		payload = {
-			"chat_id": chat_id,
-			"text": text
-		}
-		if parse_mode:
-			payload['parse_mode'] = parse_mode
-
 		try:
-			# FIXME: Выводит в debug url с токеном бота!!!
-			response = requests.post(url, json = payload)
-			response.raise_for_status()
-		except requests.exceptions.RequestException as e:
-			_logger.error(
-				f"Ошибка при отправке сообщения телеграм ботом "
-				f"(code {e.response.status_code}): {e.response.text}")
+			client.send_message(chat_id, text, parse_mode = parse_mode)
+		except TelegramAPIError as e:
+			_logger.error(f"Ошибка при отправке сообщения телеграм ботом {e}")
 			return False
 
 		return True
@@ -85,7 +155,132 @@ class TelegrammBotSendingSettings(SingletonModel):
 		help_text = "Либо число, либо отрицательное число для группы, согласно документации telegram."
 	)
 
+	use_bot_pool = models.BooleanField(default = False, verbose_name = "Распределять отправку между ботами",
+		help_text = "Уведомления отправляет наименее загруженный из ботов с отметкой "
+					"\"В пуле ботов для уведомлений\" (и основной бот, если задан).")
+
+	digest_enabled = models.BooleanField(default = False, verbose_name = "Объединять уведомления при наплыве заявок",
+		help_text = "Если в чат недавно уже отправлялось уведомление, новые заявки копятся и "
+					"отправляются одним сообщением. В спокойное время уведомления приходят сразу.")
+	digest_window = models.PositiveIntegerField(default = 60, validators = [MinValueValidator(1)],
+		verbose_name = "Окно объединения, сек.",
+		help_text = "Не чаще одного сообщения в чат за это время, пока идёт наплыв заявок.")
+	digest_max_size = models.PositiveSmallIntegerField(default = 20, validators = [MinValueValidator(2), MaxValueValidator(40)],
+		verbose_name = "Максимум заявок в одном сообщении",
+		help_text = "Если накопилось столько заявок - сообщение отправляется, не дожидаясь конца окна.")
+
 	class Meta:
 		verbose_name = "Настройки Telegram уведомлений"
 		verbose_name_plural = "Настройки Telegram уведомлений"
 	def __str__(self): return "Настройки Telegram уведомлений"
+
+	def get_chat_ids_for(self, application: Application, routes: list['NotificationRoute'] | None = None) -> list[str]:
+		"""
+		Чаты, в которые нужно отправить уведомление о заявке: основной чат (если задан)
+		и чаты всех подходящих маршрутов.
+
+		Args:
+			routes: Заранее загруженные активные маршруты (чтобы не запрашивать их для каждой заявки).
+		"""
+		if routes is None:
+			routes = list(self.routes.filter(is_active = True))
+
+		chat_ids = [self.notifications_channel_id] if self.notifications_channel_id else []
+		for route in routes:
+			if route.matches(application) and route.chat_id not in chat_ids:
+				chat_ids.append(route.chat_id)
+		return chat_ids
+
+
+class ApplicationsCounter(SingletonModel):
+	"""
+	Количество заявок, поддерживается сигналами при создании и удалении заявок (см.
+	`applications.signals`) - чтобы не выполнять `COUNT(*)` по всей таблице в админке.
+	Строка создаётся миграцией `0024_fill_applicationscounter`.
+	"""
+	total = models.PositiveBigIntegerField(verbose_name = "Всего заявок", default = 0)
+
+	class Meta:
+		verbose_name = "Счётчик заявок"
+		verbose_name_plural = "Счётчик заявок"
+	def __str__(self): return "Счётчик заявок"
+
+	@classmethod
+	def get_total(cls) -> int:
+		try:
+			return cls.objects.values_list('total', flat = True).get(pk = cls.singleton_instance_id)
+		except cls.DoesNotExist:
+			# Строку удалили вручную - точный подсчёт, без создания строки наперегонки с сигналами
+			_logger.error("Строка счётчика заявок не найдена (создаётся миграцией 0024_fill_applicationscounter)")
+			return Application.objects.count()
+
+	@classmethod
+	def add(cls, amount: int):
+		# Без чтения строки - атомарно и без гонок между процессами. Не меньше нуля:
+		# total - PositiveBigIntegerField, расхождение не должно ломать удаление заявок
+		cls.objects.filter(pk = cls.singleton_instance_id).update(total = Greatest(models.F('total') + amount, 0))
+
+
+class ApplicationDailySummary(models.Model):
+	"""
+	Количество заявок за день по населённому пункту. Поддерживается сигналами при создании
+	и удалении заявок (см. `applications.summary`), перенесённые в архив заявки учитываются.
+	"""
+	day = models.DateField(verbose_name = "День")
+	settlement = models.CharField(verbose_name = "Населённый пункт", max_length = 64)
+	count = models.PositiveIntegerField(verbose_name = "Заявок", default = 0)
+
+	class Meta:
+		verbose_name = "Заявки за день"
+		verbose_name_plural = "Заявки по дням"
+		constraints = [
+			models.UniqueConstraint(fields = ('day', 'settlement'), name = 'daily_summary_day_settlement_unique'),
+		]
+
+	def __str__(self):
+		return f"{self.settlement} {self.day:%d.%m.%Y}: {self.count}"
+
+class NotificationRoute(models.Model):
+	"""Дополнительный чат для уведомлений, например - для вербовщиков отдельного района."""
+	# Исключительно техническое поле для работы Inline формы в админке TelegrammBotSendingSettings
+	sending_settings = models.ForeignKey(TelegrammBotSendingSettings, on_delete = models.CASCADE, related_name = 'routes')
+
+	chat_id = models.CharField(max_length = 64, validators = [string_is_correct_numeric_validator],
+		verbose_name = "ID чата",
+		help_text = "Либо число, либо отрицательное число для группы, согласно документации telegram.")
+	settlements = models.TextField(blank = True, verbose_name = "Населённые пункты",
+		help_text = "По одному на строку, регистр не важен. Если пусто - в чат приходят все заявки.")
+	is_active = models.BooleanField(default = True, verbose_name = "Включён")
+
+	class Meta:
+		verbose_name = "Маршрут уведомлений"
+		verbose_name_plural = "Маршруты уведомлений"
+
+	def __str__(self):
+		return f"Уведомления в {self.chat_id}"
+
+	def matches(self, application: Application) -> bool:
+		settlements = {line.strip().casefold() for line in self.settlements.splitlines() if line.strip()}
+		return not settlements or application.settlement.strip().casefold() in settlements
+
+
+# MARK: API
+class IntegrationPartner(models.Model):
+	"""Партнёр, передающий заявки пачками через API (см. `applications.views.BulkApplicationsView`)."""
+	name = models.CharField(verbose_name = "Название", max_length = 128)
+	token_env_variable_name = models.CharField(
+		verbose_name = "ENV-переменная с токеном",
+		unique = True, max_length = 128, validators = [env_variable_name_validator],
+		help_text = "Партнёр передаёт токен в заголовке \"Authorization: Bearer <токен>\".")
+	is_active = models.BooleanField(verbose_name = "Доступ разрешён", default = True)
+
+	class Meta:
+		verbose_name = "Партнёр (API)"
+		verbose_name_plural = "Партнёры (API)"
+
+	def __str__(self):
+		return self.name
+
+	def check_token(self, token: str) -> bool:
+		expected = getenv(self.token_env_variable_name)
+		return bool(expected) and compare_digest(expected.encode(), token.encode())
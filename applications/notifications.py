@@ -0,0 +1,536 @@
+"""
+Уведомления о новых заявках в Telegram
+--------------------------------------
+Уведомления работают через outbox (`ApplicationNotification`): запись создаётся в той же
+транзакции, что и заявка, поэтому уведомление не теряется ни при недоступности Telegram,
+ни при падении процесса сразу после сохранения заявки.
+
+Доставка:
+- **Быстрый путь** - после коммита id уведомлений передаются в фоновую очередь
+(`notifications_queue`), время обработки формы не зависит от Telegram.
+- **Надёжный путь** - команда `manage.py send_notifications` пачками разбирает всё, что
+не удалось отправить сразу, с экспоненциальной задержкой между попытками. После
+`TELEGRAM_NOTIFICATIONS_MAX_ATTEMPTS` неудачных попыток уведомление помечается как
+`DEAD` и больше не отправляется (его можно вернуть в очередь из админки).
+
+Уведомление отправляется в основной чат и в чаты всех подходящих маршрутов
+(`NotificationRoute`, например - по населённому пункту), в разные чаты - параллельно.
+Если при создании заявки ни одного чата не настроено, создаётся запись без чата - чаты
+для неё выбираются при отправке. Пока нет бота или чатов, уведомления ждут настройки
+(проверка раз в `TELEGRAM_NOTIFICATIONS_NOT_CONFIGURED_RETRY`), попытки не засчитываются.
+
+Режим объединения (`TelegrammBotSendingSettings.digest_enabled`): если в чат недавно уже
+отправлялось уведомление, новые копятся до конца окна (или до `digest_max_size` штук)
+и уходят одним сообщением. В спокойное время уведомления отправляются сразу.
+
+Перед отправкой уведомление "захватывается" условным UPDATE-ом на время
+`TELEGRAM_NOTIFICATIONS_LEASE`, поэтому одно и то же уведомление не отправляется
+параллельно фоновой очередью и командой (или несколькими экземплярами команды).
+"""
+
+from concurrent.futures import ThreadPoolExecutor, Future
+from datetime 	import datetime, timedelta
+from functools 	import partial
+from html 		import escape
+from math 		import ceil
+from typing 	import Iterable
+import logging, random, threading
+
+from django.conf 		import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.db 			import transaction
+from django.db.models 	import Q, Max, Count
+from django.utils 		import timezone
+
+from applications.bot_pool 	import bot_pool, get_notification_bots, BotsUnavailableError
+from applications.models 	import Application, ApplicationNotification, TelegramBot, TelegrammBotSendingSettings
+from applications.telegram 	import TelegramBotClient, TelegramAPIError
+from shared.background 		import BackgroundTaskQueue
+
+
+_logger = logging.getLogger(__name__)
+
+_MAX_ATTEMPTS: int = getattr(settings, 'TELEGRAM_NOTIFICATIONS_MAX_ATTEMPTS', 8)
+_BACKOFF_BASE: timedelta = getattr(settings, 'TELEGRAM_NOTIFICATIONS_BACKOFF_BASE', timedelta(seconds = 30))
+_BACKOFF_MAX: timedelta = getattr(settings, 'TELEGRAM_NOTIFICATIONS_BACKOFF_MAX', timedelta(hours = 1))
+_LEASE: timedelta = getattr(settings, 'TELEGRAM_NOTIFICATIONS_LEASE', timedelta(minutes = 2))
+_NOT_CONFIGURED_RETRY: timedelta = getattr(settings, 'TELEGRAM_NOTIFICATIONS_NOT_CONFIGURED_RETRY', timedelta(minutes = 5))
+# Ошибки, для которых трейсбек в логах не нужен
+_EXPECTED_ERRORS = (ImproperlyConfigured, TelegramAPIError, BotsUnavailableError)
+# Максимальная длина текста сообщения в Bot API
+_MAX_MESSAGE_LENGTH = 4096
+
+class NotificationsNotConfiguredError(ImproperlyConfigured):
+	"""Нет бота или чата для уведомлений - уведомление откладывается без попытки, как при лимитах."""
+	def __init__(self, message: str):
+		super().__init__(message)
+		self.retry_after: float = _NOT_CONFIGURED_RETRY.total_seconds()
+
+
+notifications_queue = BackgroundTaskQueue(
+	'telegram-notifications',
+	workers = getattr(settings, 'TELEGRAM_NOTIFICATIONS_WORKERS', 2),
+	max_size = getattr(settings, 'TELEGRAM_NOTIFICATIONS_QUEUE_SIZE', 100),
+	logger = _logger,
+)
+# Только сетевые запросы (без БД), поэтому потокам не нужны свои соединения с БД
+_fanout_executor = ThreadPoolExecutor(
+	max_workers = getattr(settings, 'TELEGRAM_NOTIFICATIONS_FANOUT_WORKERS', 8),
+	thread_name_prefix = 'telegram-fanout',
+)
+
+
+# MARK: Сообщения
+# Сообщения отправляются с parse_mode="HTML" - данные заявки экранируются
+def build_application_message(application: Application) -> str:
+	return f"""
+<b>Новая заявка!</b>
+Человек: {escape(application.requestener_name)}
+Населённый пункт: {escape(application.settlement)}
+Номер для связи: {escape(str(application.phone_number))}
+"""
+
+
+def _build_digest_line(number: int, application: Application) -> str:
+	return f"{number}. {escape(application.requestener_name)}, {escape(application.settlement)}, {escape(str(application.phone_number))}"
+
+def _build_digest_header(count: int) -> str:
+	return f"\n<b>Новые заявки: {count}</b>\n"
+
+def build_digest_message(applications: list[Application]) -> str:
+	lines = "\n".join(
+		_build_digest_line(i, application)
+		for i, application in enumerate(applications, start = 1)
+	)
+	return f"{_build_digest_header(len(applications))}{lines}\n"
+
+
+# MARK: Постановка в очередь
+def _get_send_time(sending_settings: TelegrammBotSendingSettings, chat_id: str, new_count: int) -> datetime:
+	"""
+	Когда отправлять новые уведомления в чат: сразу, если режим объединения выключен,
+	в чат давно ничего не отправлялось или накопилось достаточно заявок; иначе -
+	по окончании окна объединения, одним сообщением со всеми накопившимися заявками.
+	"""
+	now = timezone.now()
+	if not sending_settings.digest_enabled:
+		return now
+
+	window = timedelta(seconds = sending_settings.digest_window)
+	last_sent_at: datetime | None = (
+		ApplicationNotification.objects
+		.filter(chat_id = chat_id, status = ApplicationNotification.Status.SENT)
+		.aggregate(last_sent_at = Max('sent_at'))['last_sent_at']
+	)
+	if last_sent_at is None or now - last_sent_at >= window:
+		return now
+
+	waiting = ApplicationNotification.objects.filter(chat_id = chat_id, status = ApplicationNotification.Status.PENDING).count()
+	if waiting + new_count >= sending_settings.digest_max_size:
+		return now
+
+	return last_sent_at + window
+
+# Отложенные отправки накопившихся уведомлений: (чат, время) -> таймер уже запущен
+_scheduled_digests: set[tuple[str, datetime]] = set()
+_scheduled_digests_lock = threading.Lock()
+
+def _deliver_chat_digest(chat_id: str, send_at: datetime):
+	with _scheduled_digests_lock:
+		_scheduled_digests.discard((chat_id, send_at))
+
+	due_ids = (
+		ApplicationNotification.objects
+		.filter(chat_id = chat_id, status = ApplicationNotification.Status.PENDING, next_attempt_at__lte = timezone.now())
+		.order_by('created_at')
+		.values_list('pk', flat = True)
+	)
+	deliver_notifications(list(due_ids))
+
+def _schedule_deliveries(ids_by_send_time: dict[tuple[str, datetime], list[int]]):
+	now = timezone.now()
+	due_ids: list[int] = []
+
+	for (chat_id, send_at), notification_ids in ids_by_send_time.items():
+		delay = (send_at - now).total_seconds()
+		if delay <= 0:
+			due_ids.extend(notification_ids)
+			continue
+
+		# Один таймер на чат и окно: он отправит все накопившиеся к этому времени уведомления
+		with _scheduled_digests_lock:
+			if (chat_id, send_at) in _scheduled_digests:
+				continue
+			_scheduled_digests.add((chat_id, send_at))
+
+		timer = threading.Timer(delay, notifications_queue.submit, args = (_deliver_chat_digest, chat_id, send_at))
+		timer.daemon = True
+		timer.start()
+
+	if due_ids:
+		# Одной задачей - чтобы уведомления во все чаты ушли параллельно (см. deliver_notifications).
+		# Если очередь переполнена - уведомления всё равно отправит send_notifications
+		notifications_queue.submit(deliver_notifications, due_ids)
+
+def enqueue_application_notifications(applications: Iterable[Application]) -> list[ApplicationNotification]:
+	"""
+	Создаёт записи outbox для заявок (по одной на каждый чат, куда нужно отправить
+	уведомление, повторные заявки пропускаются) и после коммита передаёт их в фоновую очередь.
+	Вызывайте внутри транзакции, в которой создаются заявки.
+	"""
+	# О повторных заявках (см. applications.duplicates) не уведомляем
+	applications = [application for application in applications if application.duplicate_of_id is None]
+	if not applications:
+		return []
+
+	sending_settings = TelegrammBotSendingSettings.get_solo()
+	routes = list(sending_settings.routes.filter(is_active = True))
+
+	# Без чата - запись всё равно создаётся, чаты выберутся при отправке (см. _assign_chats)
+	chat_ids_by_application = {
+		application: sending_settings.get_chat_ids_for(application, routes) or ['']
+		for application in applications
+	}
+
+	new_counts: dict[str, int] = {}
+	for chat_ids in chat_ids_by_application.values():
+		for chat_id in chat_ids:
+			new_counts[chat_id] = new_counts.get(chat_id, 0) + 1
+	send_times = {
+		chat_id: _get_send_time(sending_settings, chat_id, new_count) if chat_id else timezone.now()
+		for chat_id, new_count in new_counts.items()
+	}
+
+	notifications = ApplicationNotification.objects.bulk_create(
+		ApplicationNotification(application = application, chat_id = chat_id, next_attempt_at = send_times[chat_id])
+		for application, chat_ids in chat_ids_by_application.items()
+		for chat_id in chat_ids
+	)
+
+	ids_by_send_time: dict[tuple[str, datetime], list[int]] = {}
+	for notification in notifications:
+		ids_by_send_time.setdefault((notification.chat_id, notification.next_attempt_at), []).append(notification.pk)
+	transaction.on_commit(partial(_schedule_deliveries, ids_by_send_time))
+
+	return notifications
+
+
+# MARK: Доставка
+def _claim(notification_id: int, *, only_due: bool = True) -> ApplicationNotification | None:
+	now = timezone.now()
+	notifications = ApplicationNotification.objects.filter(
+		Q(locked_until__isnull = True) | Q(locked_until__lt = now),
+		pk = notification_id,
+		status = ApplicationNotification.Status.PENDING,
+	)
+	if only_due:
+		notifications = notifications.filter(next_attempt_at__lte = now)
+
+	if not notifications.update(locked_until = now + _LEASE):
+		return None
+	return ApplicationNotification.objects.select_related('application').get(pk = notification_id)
+
+def _assign_chats(notification: ApplicationNotification) -> list[int]:
+	"""
+	Выбирает чаты для уведомления, созданного без чата: уведомление получает первый чат,
+	для остальных создаются новые записи (их id возвращаются).
+
+	Raises:
+		NotificationsNotConfiguredError: Чатов для уведомления всё ещё нет.
+	"""
+	chat_ids = TelegrammBotSendingSettings.get_solo().get_chat_ids_for(notification.application)
+	if not chat_ids:
+		raise NotificationsNotConfiguredError("Не настроен чат для уведомлений")
+
+	with transaction.atomic():
+		notification.chat_id = chat_ids[0]
+		notification.save(update_fields = ['chat_id'])
+		return [
+			created.pk for created in ApplicationNotification.objects.bulk_create(
+				ApplicationNotification(application = notification.application, chat_id = chat_id)
+				for chat_id in chat_ids[1:]
+			)
+		]
+
+def _claim_digest(notification: ApplicationNotification) -> list[ApplicationNotification]:
+	"""Захватывает вместе с уведомлением остальные ожидающие уведомления в тот же чат."""
+	sending_settings = TelegrammBotSendingSettings.get_solo()
+	if not sending_settings.digest_enabled:
+		return [notification]
+
+	group = [notification]
+	tried_ids = {notification.pk}
+	# Уже захваченные другими воркерами уведомления не попадают в выборку, а проигранные
+	# гонки за захват добираются следующей выборкой - пока группа не заполнится
+	while len(group) < sending_settings.digest_max_size:
+		waiting_ids = list(
+			ApplicationNotification.objects
+			.filter(
+				Q(locked_until__isnull = True) | Q(locked_until__lt = timezone.now()),
+				chat_id = notification.chat_id,
+				status = ApplicationNotification.Status.PENDING,
+			)
+			.exclude(pk__in = tried_ids)
+			.order_by('created_at', 'pk')
+			.values_list('pk', flat = True)[:sending_settings.digest_max_size - len(group)]
+		)
+		if not waiting_ids:
+			break
+
+		tried_ids.update(waiting_ids)
+		group += [claimed for waiting_id in waiting_ids if (claimed := _claim(waiting_id, only_due = False))]
+	# Заявки из одной пачки API создаются одновременно - порядок по pk
+	group.sort(key = lambda claimed: (claimed.created_at, claimed.pk))
+	return _fit_digest(group)
+
+def _fit_digest(group: list[ApplicationNotification]) -> list[ApplicationNotification]:
+	"""
+	Оставляет в группе столько уведомлений, сколько помещается в одно сообщение
+	(`_MAX_MESSAGE_LENGTH`), с остальных снимает захват - они уйдут следующим сообщением.
+	"""
+	# Заголовок с количеством - с запасом по длине числа
+	length = len(_build_digest_header(len(group))) + 1
+	size = 0
+	for i, notification in enumerate(group, start = 1):
+		length += len(_build_digest_line(i, notification.application)) + 1
+		if length > _MAX_MESSAGE_LENGTH and size:
+			break
+		size = i
+
+	if size < len(group):
+		ApplicationNotification.objects.filter(pk__in = [rest.pk for rest in group[size:]]).update(locked_until = None)
+	return group[:size]
+
+def _get_backoff(attempts: int) -> timedelta:
+	delay = min(_BACKOFF_BASE * 2 ** (attempts - 1), _BACKOFF_MAX)
+	# Небольшой разброс, чтобы отложенные уведомления не уходили одной пачкой
+	return delay + delay * random.uniform(0, 0.1)
+
+def _send(client: TelegramBotClient, notifications: list[ApplicationNotification]) -> int:
+	"""
+	Отправляет одно уведомление, либо несколько одним сообщением (в один чат).
+	Не обращается к БД - выполняется в потоках `_fanout_executor`. Лимитов не ждёт:
+	если отправлять в чат пока нельзя - `TelegramAPIError` с `retry_after`, а поток
+	сразу освобождается для других чатов.
+
+	Returns:
+		ID отправленного сообщения.
+
+	Raises:
+		TelegramAPIError: Telegram не принял сообщение, либо отправку нужно отложить.
+	"""
+	if len(notifications) == 1:
+		message = build_application_message(notifications[0].application)
+	else:
+		message = build_digest_message([notification.application for notification in notifications])
+
+	return client.send_message(notifications[0].chat_id, message, parse_mode = "HTML", max_wait = 0)
+
+def _submit_send(client: TelegramBotClient, notifications: list[ApplicationNotification]) -> Future:
+	try:
+		return _fanout_executor.submit(_send, client, notifications)
+	except RuntimeError:
+		# Пул потоков останавливается при завершении интерпретатора раньше, чем
+		# дорабатывает фоновая очередь (atexit) - отправляем в текущем потоке
+		future = Future()
+		try:
+			future.set_result(_send(client, notifications))
+		except Exception as e:
+			future.set_exception(e)
+		return future
+
+def _is_bot_failure(error: Exception | None) -> bool:
+	"""Ошибка говорит о проблеме с ботом или Bot API, а не с конкретным чатом или лимитами."""
+	if not isinstance(error, TelegramAPIError) or error.retry_after is not None:
+		return False
+	# 401/404 - неверный токен, 400/403 - проблемы конкретного чата (не найден, бот удалён и т.п.)
+	return error.status_code is None or error.status_code >= 500 or error.status_code in (401, 404)
+
+def _is_rejected_digest(group: list[ApplicationNotification], error: Exception | None) -> bool:
+	"""Telegram отклонил объединённое сообщение (400) - возможно, из-за одной заявки в нём."""
+	return (
+		len(group) > 1
+		and isinstance(error, TelegramAPIError)
+		and error.status_code == 400
+		and error.retry_after is None
+	)
+
+def _record_result(notifications: list[ApplicationNotification], error: Exception | None, message_id: int | None = None):
+	names = ', '.join(f'#{notification.pk}' for notification in notifications)
+	retry_after: float | None = getattr(error, 'retry_after', None)
+
+	if isinstance(error, _EXPECTED_ERRORS):
+		_logger.warning(f"Уведомления {names} не отправлены: {error}")
+	elif error is not None:
+		_logger.error(f"Ошибка при отправке уведомлений {names}", exc_info = error)
+
+	now = timezone.now()
+	for notification in notifications:
+		notification.locked_until = None
+
+		if error is None:
+			notification.attempts += 1
+			notification.status = ApplicationNotification.Status.SENT
+			notification.sent_at = now
+			notification.telegram_message_id = message_id
+			notification.delivery_time = now - notification.application.date
+			notification.last_error = ''
+		elif retry_after is not None:
+			# Упёрлись в лимиты Telegram - это не ошибка доставки, просто ждём сколько сказано
+			notification.last_error = str(error)
+			notification.next_attempt_at = now + timedelta(seconds = retry_after)
+		else:
+			notification.attempts += 1
+			notification.last_error = str(error) if isinstance(error, _EXPECTED_ERRORS) \
+				else f"{type(error).__name__}: {error}"
+			if notification.attempts >= _MAX_ATTEMPTS:
+				notification.status = ApplicationNotification.Status.DEAD
+				_logger.error(f"{notification} не отправлено за {notification.attempts} попыток: {error}")
+			else:
+				notification.next_attempt_at = now + _get_backoff(notification.attempts)
+
+	ApplicationNotification.objects.bulk_update(
+		notifications, (
+			'status', 'attempts', 'next_attempt_at', 'locked_until', 'last_error',
+			'sent_at', 'telegram_message_id', 'delivery_time',
+		))
+
+def deliver_notifications(notification_ids: Iterable[int]) -> int:
+	"""
+	Отправляет уведомления, которые удалось захватить (ожидающие отправки, срок которых
+	наступил и которые сейчас никто не отправляет). В режиме объединения вместе с каждым
+	из них отправляются и остальные ожидающие уведомления в тот же чат.
+
+	Сообщения в разные чаты отправляются параллельно (`TELEGRAM_NOTIFICATIONS_FANOUT_WORKERS`
+	потоков), так что время доставки почти не зависит от количества чатов. В режиме пула
+	ботов каждое сообщение отправляет наименее загруженный бот (см. `applications.bot_pool`).
+	Если все боты недоступны (разомкнут circuit breaker), уведомления сразу откладываются
+	до его восстановления, попытка при этом не засчитывается. Так же (без попытки) откладываются
+	уведомления, пока не настроен бот или чат (см. `_assign_chats`), и уведомления в чаты,
+	лимит отправки в которые исчерпан: потоки не ждут лимитов, отложенные по лимитам
+	уведомления отправятся по таймеру (или командой `send_notifications`).
+
+	Объединённое сообщение не длиннее лимита Telegram (лишние уведомления уйдут следующим).
+	Если Telegram отклонил его (400), уведомления группы отправляются по одному.
+
+	Returns:
+		Количество успешно отправленных уведомлений.
+	"""
+	sent = 0
+	# (чат, время) -> отложенные по лимитам уведомления, см. _schedule_deliveries. Ждущие
+	# настройки бота или чата - без таймеров, их проверяет send_notifications
+	deferred: dict[tuple[str, datetime], list[int]] = {}
+	def record(group: list[ApplicationNotification], error: Exception | None, message_id: int | None = None):
+		_record_result(group, error, message_id)
+		if getattr(error, 'retry_after', None) is not None and not isinstance(error, NotificationsNotConfiguredError):
+			for notification in group:
+				deferred.setdefault((notification.chat_id, notification.next_attempt_at), []).append(notification.pk)
+
+	groups: list[list[ApplicationNotification]] = []
+	notification_ids = list(notification_ids)
+	while notification_ids:
+		if notification := _claim(notification_ids.pop(0)):
+			if not notification.chat_id:
+				try:
+					notification_ids += _assign_chats(notification)
+				except NotificationsNotConfiguredError as e:
+					record([notification], e)
+					continue
+			groups.append(_claim_digest(notification))
+
+	bots = get_notification_bots(TelegrammBotSendingSettings.get_solo()) if groups else []
+	if groups and not bots:
+		for group in groups:
+			record(group, NotificationsNotConfiguredError("Бот для уведомлений не настроен"))
+		groups = []
+
+	while groups:
+		futures: list[tuple[list[ApplicationNotification], TelegramBot, Future]] = []
+		for group in groups:
+			try:
+				bot, client = bot_pool.acquire(bots)
+			except BotsUnavailableError as e:
+				record(group, e)
+				continue
+			futures.append((group, bot, _submit_send(client, group)))
+
+		groups = []
+		for group, bot, future in futures:
+			error = future.exception()
+			bot_pool.release(bot, success = not _is_bot_failure(error))
+
+			if _is_rejected_digest(group, error):
+				# Одна заявка не должна задерживать остальные - отправляем по одной,
+				# попытка засчитывается только тем, что не отправятся и так
+				_logger.warning(f"Объединённое сообщение в {group[0].chat_id} отклонено ({error}), отправка по одному")
+				groups.extend([notification] for notification in group)
+				continue
+
+			record(group, error, None if error else future.result())
+			sent += len(group) if error is None else 0
+
+	if deferred:
+		_schedule_deliveries(deferred)
+	return sent
+
+def process_due_notifications(batch_size: int = 50) -> int:
+	"""
+	Обрабатывает пачку уведомлений, срок отправки которых наступил.
+
+	Returns:
+		Количество уведомлений в обработанной пачке.
+	"""
+	now = timezone.now()
+	ids = list(
+		ApplicationNotification.objects
+		.filter(status = ApplicationNotification.Status.PENDING, next_attempt_at__lte = now)
+		.filter(Q(locked_until__isnull = True) | Q(locked_until__lt = now))
+		.order_by('next_attempt_at')
+		.values_list('pk', flat = True)[:batch_size]
+	)
+	deliver_notifications(ids)
+	return len(ids)
+
+def requeue_notifications(notifications) -> int:
+	"""Возвращает уведомления (QuerySet) в очередь на отправку, сбрасывая счётчик попыток."""
+	return notifications.exclude(status = ApplicationNotification.Status.SENT).update(
+		status = ApplicationNotification.Status.PENDING,
+		attempts = 0,
+		next_attempt_at = timezone.now(),
+		locked_until = None,
+	)
+
+
+# MARK: Статистика
+_PERCENTILES = (50, 90, 95, 99)
+
+def get_delivery_stats(since: datetime | None = None) -> dict:
+	"""
+	Статистика доставки уведомлений, созданных после `since` (по умолчанию - за всё время):
+	- `by_status` - количество уведомлений в каждом статусе;
+	- `delivery_time` - перцентили (p50, p90, p95, p99) и максимум времени от создания
+	заявки до отправки уведомления, `None` - если отправленных уведомлений нет.
+	"""
+	notifications = ApplicationNotification.objects.all()
+	if since is not None:
+		notifications = notifications.filter(created_at__gte = since)
+
+	by_status = {status: 0 for status in ApplicationNotification.Status.values}
+	for row in notifications.values('status').annotate(count = Count('pk')):
+		by_status[row['status']] = row['count']
+
+	delivery_times: list[timedelta] = list(
+		notifications
+		.filter(status = ApplicationNotification.Status.SENT, delivery_time__isnull = False)
+		.order_by('delivery_time')
+		.values_list('delivery_time', flat = True)
+	)
+	if not delivery_times:
+		return {'by_status': by_status, 'delivery_time': None}
+
+	# Метод ближайшего ранга
+	percentiles = {
+		f'p{percentile}': delivery_times[max(ceil(len(delivery_times) * percentile / 100) - 1, 0)]
+		for percentile in _PERCENTILES
+	}
+	return {'by_status': by_status, 'delivery_time': {**percentiles, 'max': delivery_times[-1]}}
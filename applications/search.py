@@ -0,0 +1,99 @@
+"""
+Поиск заявок
+------------
+Полнотекстовый поиск по имени, населённому пункту и номеру телефона через индекс SQLite FTS5
+`applications_application_fts` (создаётся миграцией `0023_application_fts`, обновляется
+триггерами) - без `LIKE '%...%'` по всей таблице заявок.
+
+Каждое слово запроса ищется по началу ("иван моск" найдёт "Иванов Иван из Москвы"), все
+слова должны найтись. Номер телефона можно вводить в любом формате: "+7 999 123",
+"8999123", "999-12".
+
+Используется в поиске по заявкам в админке и в `GET /api/applications/search`
+(см. `applications.views.ApplicationSearchView`). В других СУБД - поиск через `icontains`.
+"""
+
+import re
+
+from django.db 				import connection
+from django.db.models 		import Q, QuerySet
+from django.db.models.expressions import RawSQL
+
+from applications.models import Application
+
+
+_FTS_TABLE = 'applications_application_fts'
+_TOKEN_PATTERN = re.compile(r'[\w+()-]+')
+_PHONE_PATTERN = re.compile(r'^[+(]*\d[\d()-]*$')
+_WORD_PATTERN = re.compile(r'[^\W_]+')
+
+
+def _normalize_token(token: str) -> list[str]:
+	if _PHONE_PATTERN.match(token):
+		digits = re.sub(r'\D', '', token)
+		# Российский номер с 8 вместо +7 - как в E.164
+		if len(digits) > 1 and digits[0] == '8' and not token.startswith('+'):
+			digits = '7' + digits[1:]
+		return [digits]
+	# Как токенизатор unicode61: "Санкт-Петербург" - два слова
+	return _WORD_PATTERN.findall(token.casefold().replace('ё', 'е'))
+
+def _join_phone_tokens(query: str) -> list[str]:
+	# "+7 999 123 45 67" - один номер: подряд идущие числа склеиваются
+	tokens: list[str] = []
+	for token in _TOKEN_PATTERN.findall(query):
+		if tokens and _PHONE_PATTERN.match(token) and _PHONE_PATTERN.match(tokens[-1]):
+			tokens[-1] += token
+		else:
+			tokens.append(token)
+	return tokens
+
+def build_match_query(query: str) -> str | None:
+	"""
+	Выражение FTS5 MATCH для поискового запроса: каждое слово - по началу, все слова обязательны.
+
+	Returns:
+		`None`, если в запросе нет слов.
+	"""
+	terms = [term for token in _join_phone_tokens(query) for term in _normalize_token(token)]
+	if not terms:
+		return None
+	# В кавычках - слово не разбирается как синтаксис FTS5 (AND, NEAR, "-" и т.д.)
+	return ' '.join(f'"{term}"*' for term in terms)
+
+def is_available() -> bool:
+	return connection.vendor == 'sqlite'
+
+
+def filter_applications(queryset: QuerySet[Application], query: str) -> QuerySet[Application]:
+	"""Заявки из `queryset`, подходящие под поисковый запрос (без сортировки по релевантности)."""
+	match = build_match_query(query)
+	if match is None:
+		return queryset
+
+	if not is_available():
+		condition = Q()
+		for term in query.split():
+			condition &= Q(requestener_name__icontains = term) | Q(settlement__icontains = term) | Q(phone_number__icontains = term)
+		return queryset.filter(condition)
+
+	return queryset.filter(pk__in = RawSQL(f"SELECT rowid FROM {_FTS_TABLE} WHERE {_FTS_TABLE} MATCH %s", (match, )))
+
+def search_applications(query: str, limit: int = 20) -> list[Application]:
+	"""Заявки, подходящие под поисковый запрос, по убыванию релевантности (bm25)."""
+	match = build_match_query(query)
+	if match is None:
+		return []
+
+	if not is_available():
+		return list(filter_applications(Application.objects.order_by('-date'), query)[:limit])
+
+	with connection.cursor() as cursor:
+		cursor.execute(
+			f"SELECT rowid FROM {_FTS_TABLE} WHERE {_FTS_TABLE} MATCH %s ORDER BY rank LIMIT %s",
+			(match, limit),
+		)
+		ids = [row[0] for row in cursor.fetchall()]
+
+	applications = Application.objects.in_bulk(ids)
+	return [applications[pk] for pk in ids if pk in applications]
@@ -0,0 +1,131 @@
+"""
+Автодополнение населённого пункта
+---------------------------------
+Подсказки для поля "Населённый пункт" формы заявки (`GET /api/applications/settlements?q=...`)
+из `PrefixIndex` в памяти процесса - без запросов к БД.
+
+Индекс строится при первом обращении из справочника (`APPLICATIONS_SETTLEMENTS_FILE`,
+по пункту на строку) и уже введённых в заявках населённых пунктов (из сводки
+`ApplicationDailySummary`, вес - количество заявок). Новые заявки этого процесса
+добавляются в индекс сразу (см. `applications.signals`), заявки других процессов - при
+полной пересборке раз в `APPLICATIONS_SETTLEMENTS_INDEX_TTL`. Пересборка идёт в фоновом
+потоке, запросы до её окончания пользуются прежним индексом.
+
+В подсказках - пункты из справочника и пункты, указанные хотя бы в
+`APPLICATIONS_SETTLEMENTS_MIN_WEIGHT` заявках (а не любой текст из формы).
+
+Форма заявки сохраняет населённый пункт так, как его ввёл посетитель, убирая лишние
+пробелы и выравнивая регистр по индексу ("москва " -> "Москва"), - один город не дробится
+в сводке из-за регистра, а другое написание (например, "Орел" и "Орёл") не заменяется.
+"""
+
+from threading 	import Lock
+from pathlib 	import Path
+import logging, time
+
+from django.conf 		import settings
+from django.db 			import transaction
+from django.db.models 	import Sum
+
+from applications.models 	import ApplicationDailySummary
+from shared.background 		import BackgroundTaskQueue
+from shared.search 			import PrefixIndex
+
+
+_logger = logging.getLogger(__name__)
+
+# Вес пункта из справочника - выше введённых вручную вариантов
+_REFERENCE_WEIGHT = 1_000_000
+
+_index: PrefixIndex | None = None
+_built_at: float = 0
+_is_rebuilding: bool = False
+_build_lock = Lock()
+
+# Одна пересборка за раз, запросы её не ждут
+_rebuild_queue = BackgroundTaskQueue('settlements-index', workers = 1, max_size = 1, submit_timeout = 0, logger = _logger)
+
+
+def _build_index() -> PrefixIndex:
+	index = PrefixIndex()
+
+	if path := getattr(settings, 'APPLICATIONS_SETTLEMENTS_FILE', None):
+		try:
+			for line in Path(path).read_text(encoding = 'utf-8').splitlines():
+				index.add(line, _REFERENCE_WEIGHT, canonical = True)
+		except OSError as e:
+			_logger.error(f"Не удалось прочитать справочник населённых пунктов {path}: {e}")
+
+	for settlement, count in (
+			ApplicationDailySummary.objects
+			.values_list('settlement')
+			.annotate(total = Sum('count'))
+			.order_by()):
+		index.add(settlement, count)
+	return index
+
+def _rebuild_index():
+	global _index, _built_at, _is_rebuilding
+	try:
+		started = time.monotonic()
+		index = _build_index()
+		# Запросы видят либо прежний индекс, либо новый целиком
+		_index, _built_at = index, time.monotonic()
+		_logger.debug(f"Индекс населённых пунктов: {len(index)} за {_built_at - started:.3f} с")
+	finally:
+		_is_rebuilding = False
+
+def get_index() -> PrefixIndex:
+	"""
+	Индекс населённых пунктов. Строится при первом обращении, устаревший (старше
+	`APPLICATIONS_SETTLEMENTS_INDEX_TTL`) пересобирается в фоне - до окончания
+	пересборки возвращается прежний.
+	"""
+	global _is_rebuilding
+
+	ttl = getattr(settings, 'APPLICATIONS_SETTLEMENTS_INDEX_TTL', 60 * 60)
+	if _index is not None and (_is_rebuilding or time.monotonic() - _built_at < ttl):
+		return _index
+
+	with _build_lock:
+		if _index is None:
+			# Прежнего индекса нет - первый запрос ждёт построения
+			_is_rebuilding = True
+			_rebuild_index()
+			return _index
+
+		if _is_rebuilding:
+			return _index
+		_is_rebuilding = True
+
+	if not _rebuild_queue.submit(_rebuild_index):
+		_is_rebuilding = False
+	return _index
+
+def add_settlements(settlements: list[str]):
+	"""Добавляет введённые в новых заявках пункты в индекс (после коммита), если он уже построен."""
+	def add():
+		if _index is None:
+			return
+		for settlement in settlements:
+			_index.add(settlement)
+
+	transaction.on_commit(add)
+
+def suggest(prefix: str, limit: int = 10) -> list[str]:
+	# Подсказки видны всем посетителям - введённое в заявках показывается, только если
+	# так написали в нескольких заявках (справочник - всегда)
+	min_weight = getattr(settings, 'APPLICATIONS_SETTLEMENTS_MIN_WEIGHT', 3)
+	return get_index().search(prefix, limit, min_weight = min_weight)
+
+def normalize_settlement(settlement: str) -> str:
+	"""
+	Пункт, как его ввели, без лишних пробелов. Если в индексе есть тот же пункт, отличающийся
+	только регистром, - в регистре из индекса ("москва" -> "Москва").
+	"""
+	settlement = ' '.join(settlement.split())
+	indexed = get_index().get(settlement)
+	# Ключ индекса не различает и "ё"/"е" - такое написание остаётся как ввели
+	if indexed and indexed.casefold() == settlement.casefold():
+		return indexed
+	return settlement
@@ -1,22 +1,74 @@
-from django.db.models.signals 	import post_save
-from django.dispatch 			import receiver
+from django.db.models.signals 	import pre_save, post_save, post_delete
+from django.dispatch 			import receiver, Signal
 
-from applications.models import Application, TelegramBot, TelegrammBotSendingSettings
+from applications.duplicates 	import mark_duplicates
+from applications.models 		import Application, ApplicationsCounter
+from applications.notifications import enqueue_application_notifications
+from applications.summary 		import update_summary, move_in_summary, get_summary_key
+from applications.settlements 	import add_settlements
 
 
+# bulk_create не отправляет post_save, поэтому после массового создания заявок
+# (см. applications.writing.create_applications) отправляется этот сигнал. Аргументы: applications - список заявок.
+applications_bulk_created = Signal()
+
+
+@receiver(pre_save, sender = Application)
+def mark_duplicate_application(sender, instance: Application, **kwargs):
+	if instance._state.adding and instance.duplicate_of_id is None:
+		mark_duplicates([instance])
+
 @receiver(post_save, sender = Application)
 def send_notification_into_telegramm_bot(sender, instance: Application, created, **kwargs):
 	if not created:
 		return
 
-	settings = TelegrammBotSendingSettings.get_solo()
-	bot: TelegramBot = settings.bot_for_notifications
-	chat_id: str = settings.notifications_channel_id
-	msg = f"""
-<b>Новая заявка!</b>
-Человек: {instance.requestener_name}
-Населённый пункт: {instance.settlement}
-Номер для связи: {instance.phone_number}
-"""
-
-	bot.send_telegram_message(chat_id, msg, parse_mode = "HTML")
+	# Запись outbox попадает в транзакцию сохранения заявки (см. applications.writing),
+	# сама отправка - после коммита, в фоне.
+	enqueue_application_notifications([instance])
+
+@receiver(applications_bulk_created, sender = Application)
+def send_notifications_for_bulk_created(sender, applications: list[Application], **kwargs):
+	# Все уведомления пачки - одним bulk_create и одной задачей фоновой очереди
+	enqueue_application_notifications(applications)
+
+
+# MARK: Счётчик заявок
+@receiver(post_save, sender = Application)
+def count_created_application(sender, instance: Application, created, **kwargs):
+	if created:
+		ApplicationsCounter.add(1)
+
+@receiver(applications_bulk_created, sender = Application)
+def count_bulk_created_applications(sender, applications: list[Application], **kwargs):
+	ApplicationsCounter.add(len(applications))
+
+@receiver(post_delete, sender = Application)
+def count_deleted_application(sender, instance: Application, **kwargs):
+	ApplicationsCounter.add(-1)
+
+
+# MARK: Сводка по дням
+@receiver(pre_save, sender = Application)
+def remember_summary_key(sender, instance: Application, **kwargs):
+	# Населённый пункт можно изменить в админке - строка сводки запоминается до сохранения
+	if not instance._state.adding:
+		previous = Application.objects.filter(pk = instance.pk).only('date', 'settlement').first()
+		instance._previous_summary_key = previous and get_summary_key(previous)
+
+@receiver(post_save, sender = Application)
+def summarize_saved_application(sender, instance: Application, created, **kwargs):
+	if created:
+		update_summary([instance])
+		add_settlements([instance.settlement])
+	elif previous_key := getattr(instance, '_previous_summary_key', None):
+		move_in_summary(previous_key, instance)
+
+@receiver(applications_bulk_created, sender = Application)
+def summarize_bulk_created_applications(sender, applications: list[Application], **kwargs):
+	update_summary(applications)
+	add_settlements([application.settlement for application in applications])
+
+@receiver(post_delete, sender = Application)
+def summarize_deleted_application(sender, instance: Application, **kwargs):
+	update_summary([instance], -1)
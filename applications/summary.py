@@ -0,0 +1,90 @@
+"""
+Сводка заявок по дням
+---------------------
+`ApplicationDailySummary` - количество заявок за день по населённому пункту. Сводка
+обновляется вместе с заявками (см. `applications.signals`): при создании и удалении
+заявки меняется одна строка сводки, поэтому отчёты по дням и населённым пунктам читают
+O(дней × пунктов) строк, а не всю таблицу заявок.
+
+Перенос заявок в архив (`applications.archiving`) сводку не меняет. Сводка заполняется
+миграцией `0022_applicationdailysummary`, пересобрать её по заявкам и архиву -
+`manage.py rebuild_application_summary`.
+"""
+
+from collections 	import Counter
+from datetime 		import date
+from typing 		import Iterable
+
+from django.db 				import transaction
+from django.db.models 		import F, Count
+from django.db.models.functions import TruncDate, Greatest
+from django.utils 			import timezone
+
+from applications.models import Application, ArchivedApplication, ApplicationDailySummary
+
+
+SummaryKey = tuple[date, str]
+
+def get_summary_key(application: Application | ArchivedApplication) -> SummaryKey:
+	"""(день, населённый пункт) - строка сводки, к которой относится заявка."""
+	return timezone.localdate(application.date), application.settlement.strip()
+
+def _add_counts(counts: Counter[SummaryKey]):
+	# Строки, которых ещё нет, - одним запросом, без гонки между процессами
+	ApplicationDailySummary.objects.bulk_create([
+		ApplicationDailySummary(day = day, settlement = settlement)
+		for (day, settlement), count in counts.items() if count > 0
+	], ignore_conflicts = True)
+
+	for (day, settlement), count in counts.items():
+		if not count:
+			continue
+
+		rows = ApplicationDailySummary.objects.filter(day = day, settlement = settlement)
+		# Не меньше нуля: count - PositiveIntegerField, расхождение не должно ломать удаление заявок
+		rows.update(count = Greatest(F('count') + count, 0))
+		if count < 0:
+			rows.filter(count = 0).delete()
+
+def update_summary(applications: Iterable[Application], sign: int = 1):
+	"""
+	Добавляет заявки в сводку (`sign = -1` - вычитает). Один запрос на каждую пару (день, пункт).
+	"""
+	counts = Counter({key: sign * count for key, count in Counter(map(get_summary_key, applications)).items()})
+	if counts:
+		with transaction.atomic():
+			_add_counts(counts)
+
+def move_in_summary(previous_key: SummaryKey, application: Application):
+	"""Переносит заявку в сводке, если у неё изменился день или населённый пункт."""
+	key = get_summary_key(application)
+	if key != previous_key:
+		with transaction.atomic():
+			_add_counts(Counter({previous_key: -1, key: 1}))
+
+def rebuild_summary() -> int:
+	"""
+	Пересчитывает сводку по заявкам и архиву заявок.
+
+	Returns:
+		Количество строк сводки.
+	"""
+	counts: Counter[SummaryKey] = Counter()
+	for model in (Application, ArchivedApplication):
+		rows = (
+			model.objects
+			.annotate(day = TruncDate('date', tzinfo = timezone.get_current_timezone()))
+			.values_list('day', 'settlement')
+			.annotate(count = Count('pk'))
+			.order_by()
+		)
+		for day, settlement, count in rows:
+			counts[(day, settlement.strip())] += count
+
+	with transaction.atomic():
+		ApplicationDailySummary.objects.all().delete()
+		ApplicationDailySummary.objects.bulk_create([
+			ApplicationDailySummary(day = day, settlement = settlement, count = count)
+			for (day, settlement), count in counts.items()
+		], batch_size = 1000)
+	return len(counts)
@@ -0,0 +1,276 @@
+"""
+Клиент Telegram Bot API
+-----------------------
+Один `TelegramBotClient` на токен (`get_client`): внутри `requests.Session` с пулом
+keep-alive соединений, таймаутами на подключение/чтение и ограниченным числом повторов
+при ошибках подключения и 502/503/504. Токен никогда не попадает в логи и тексты ошибок.
+
+Отправка ограничивается `TelegramRateLimiter` (лимиты Bot API на бота и на чат), ответ
+429 блокирует отправку в чат на `retry_after` секунд.
+
+Адрес API задаётся настройкой `TELEGRAM_API_BASE_URL` (env-переменная с тем же именем),
+в тестах - адрес заглушки `applications.testing.FakeTelegramAPIServer`.
+
+Модуль не импортирует модели - он используется в настройках логгирования.
+"""
+
+from threading import Lock
+import logging, re, time
+
+from django.conf import settings
+
+from requests.adapters 	import HTTPAdapter
+from urllib3.util 		import Retry
+import requests
+
+from shared.rate_limiting import TokenBucket
+
+
+_logger = logging.getLogger(__name__)
+
+_TOKEN_REGEX = re.compile(r'\d{5,}:[A-Za-z0-9_-]{20,}')
+
+
+def redact_token(text: str) -> str:
+	"""Заменяет все токены ботов в тексте на `<token>`."""
+	return _TOKEN_REGEX.sub('<token>', text)
+
+class TelegramTokenRedactingFilter(logging.Filter):
+	"""
+	Фильтр логгирования, вырезающий токены ботов из сообщений (в том числе из
+	отладочных логов urllib3, где виден URL запроса).
+	"""
+	def filter(self, record: logging.LogRecord) -> bool:
+		message = record.getMessage()
+		if _TOKEN_REGEX.search(message):
+			record.msg = redact_token(message)
+			record.args = None
+		return True
+
+
+class TelegramAPIError(Exception):
+	"""
+	Ошибка запроса к Bot API.
+
+	Attributes:
+		status_code: HTTP код ответа, `None` - если ответа не было (ошибка соединения, таймаут).
+		retry_after: Через сколько секунд можно повторить запрос (при 429).
+	"""
+	def __init__(self, description: str, *, status_code: int | None = None, retry_after: float | None = None):
+		super().__init__(description)
+		self.status_code: int | None = status_code
+		self.retry_after: float | None = retry_after
+
+	def __str__(self):
+		if self.status_code is None:
+			return super().__str__()
+		return f"(code {self.status_code}) {super().__str__()}"
+
+
+class TelegramRateLimiter:
+	"""
+	Ограничения Bot API: token bucket на бота (~30 сообщений/сек) и на каждый чат
+	(~20 сообщений/мин в группу или канал, ~1 сообщение/сек в личный чат).
+
+	Если лимит исчерпан, `acquire` ждёт своей очереди (не дольше `max_wait`). Если ждать
+	дольше - выбрасывает `TelegramAPIError` с `retry_after`, чтобы отправку можно было
+	отложить, а не потерять. С `max_wait = 0` отправка не ждёт совсем - так общий пул потоков
+	не занимается ожиданием лимита одного чата.
+	"""
+	_MAX_IDLE_CHAT_BUCKETS = 1000
+
+	def __init__(
+			self,
+			*,
+			bot_rate: float | None = None,
+			group_rate_per_minute: float | None = None,
+			private_rate: float | None = None,
+			max_wait: float | None = None):
+		self._group_rate: float = (group_rate_per_minute or getattr(settings, 'TELEGRAM_API_GROUP_RATE_PER_MINUTE', 20)) / 60
+		self._private_rate: float = private_rate or getattr(settings, 'TELEGRAM_API_PRIVATE_RATE', 1)
+		self._max_wait: float = getattr(settings, 'TELEGRAM_API_MAX_WAIT', 30) if max_wait is None else max_wait
+
+		bot_rate = bot_rate or getattr(settings, 'TELEGRAM_API_BOT_RATE', 30)
+		self._bot_bucket = TokenBucket(bot_rate, bot_rate)
+		self._chat_buckets: dict[str, TokenBucket] = {}
+		self._lock = Lock()
+
+		# Метрики
+		self._waiting: int = 0
+		self._waits: int = 0
+		self._wait_seconds: float = 0
+		self._max_wait_seconds: float = 0
+		self._deferred: int = 0
+		self._throttled_by_api: int = 0
+
+	def _get_chat_bucket(self, chat_id: str) -> TokenBucket:
+		with self._lock:
+			if bucket := self._chat_buckets.get(chat_id):
+				return bucket
+
+			if len(self._chat_buckets) >= self._MAX_IDLE_CHAT_BUCKETS:
+				self._chat_buckets = {key: bucket for key, bucket in self._chat_buckets.items() if not bucket.idle}
+
+			# Группы и каналы - отрицательный ID или @username
+			is_group = chat_id.startswith(('-', '@'))
+			rate = self._group_rate if is_group else self._private_rate
+			bucket = self._chat_buckets[chat_id] = TokenBucket(rate, 1)
+			return bucket
+
+	def acquire(self, chat_id: str, *, max_wait: float | None = None) -> float:
+		"""
+		Ждёт, пока отправка в чат станет разрешена.
+
+		Args:
+			max_wait: Вместо `max_wait` лимитера.
+
+		Returns:
+			Сколько секунд пришлось ждать.
+
+		Raises:
+			TelegramAPIError: Ждать пришлось бы дольше `max_wait` (в `retry_after` - сколько).
+		"""
+		chat_bucket = self._get_chat_bucket(chat_id)
+		wait = max(chat_bucket.reserve(), self._bot_bucket.reserve())
+
+		if wait > (self._max_wait if max_wait is None else max_wait):
+			chat_bucket.release()
+			self._bot_bucket.release()
+			with self._lock:
+				self._deferred += 1
+			raise TelegramAPIError(f"Rate limit: send to {chat_id} deferred", status_code = 429, retry_after = wait)
+
+		if wait > 0:
+			with self._lock:
+				self._waiting += 1
+			try:
+				time.sleep(wait)
+			finally:
+				with self._lock:
+					self._waiting -= 1
+					self._waits += 1
+					self._wait_seconds += wait
+					self._max_wait_seconds = max(self._max_wait_seconds, wait)
+		return wait
+
+	def block(self, chat_id: str, seconds: float):
+		"""Запрещает отправку в чат на `seconds` секунд (по `retry_after` из ответа 429)."""
+		self._get_chat_bucket(chat_id).block_for(seconds)
+		with self._lock:
+			self._throttled_by_api += 1
+
+	def metrics(self) -> dict[str, float]:
+		"""
+		- `waiting` - сколько отправок сейчас ждёт своей очереди;
+		- `waits` / `wait_seconds` / `max_wait_seconds` - сколько раз и сколько всего
+		(максимум за раз) пришлось ждать;
+		- `deferred` - сколько отправок отложено, так как ждать пришлось бы слишком долго;
+		- `throttled_by_api` - сколько раз Telegram ответил 429.
+		"""
+		with self._lock:
+			return {
+				'waiting': self._waiting,
+				'waits': self._waits,
+				'wait_seconds': round(self._wait_seconds, 3),
+				'avg_wait_seconds': round(self._wait_seconds / self._waits, 3) if self._waits else 0,
+				'max_wait_seconds': round(self._max_wait_seconds, 3),
+				'deferred': self._deferred,
+				'throttled_by_api': self._throttled_by_api,
+			}
+
+
+class TelegramBotClient:
+	"""
+	Args:
+		token: Токен бота.
+		base_url: Адрес Bot API (по умолчанию `TELEGRAM_API_BASE_URL`).
+		timeout: (таймаут подключения, таймаут чтения) в секундах.
+		max_retries: Максимум повторов при ошибках подключения и 502/503/504.
+		pool_size: Максимум keep-alive соединений в пуле.
+	"""
+	def __init__(
+			self,
+			token: str,
+			*,
+			base_url: str | None = None,
+			timeout: tuple[float, float] | None = None,
+			max_retries: int | None = None,
+			pool_size: int | None = None):
+		base_url = base_url or getattr(settings, 'TELEGRAM_API_BASE_URL', 'https://api.telegram.org')
+		max_retries = getattr(settings, 'TELEGRAM_API_MAX_RETRIES', 2) if max_retries is None else max_retries
+		pool_size = pool_size or getattr(settings, 'TELEGRAM_API_POOL_SIZE', 4)
+
+		self._url: str = f"{base_url.rstrip('/')}/bot{token}/"
+		self._timeout: tuple[float, float] = timeout or getattr(settings, 'TELEGRAM_API_TIMEOUT', (3.05, 10))
+
+		# POST повторяется только если запрос точно не был обработан: ошибка подключения,
+		# либо шлюз перед API не передал запрос дальше (502/503/504). Таймаут чтения не повторяется.
+		retry = Retry(
+			total = max_retries, connect = max_retries, read = 0, status = max_retries,
+			status_forcelist = (502, 503, 504), allowed_methods = None,
+			backoff_factor = 0.3, raise_on_status = False, respect_retry_after_header = False,
+		)
+		self._session = requests.Session()
+		self._session.mount(self._url, HTTPAdapter(pool_connections = 1, pool_maxsize = pool_size, max_retries = retry))
+
+		self.rate_limiter = TelegramRateLimiter()
+
+	def _call(self, method: str, payload: dict) -> dict:
+		try:
+			response = self._session.post(self._url + method, json = payload, timeout = self._timeout)
+		except requests.exceptions.RequestException as e:
+			raise TelegramAPIError(redact_token(f"{type(e).__name__}: {e}")) from None
+
+		try:
+			data: dict = response.json()
+		except ValueError:
+			raise TelegramAPIError(redact_token(response.text[:200]), status_code = response.status_code) from None
+
+		if not data.get('ok'):
+			raise TelegramAPIError(
+				redact_token(data.get('description', '')),
+				status_code = data.get('error_code', response.status_code),
+				retry_after = data.get('parameters', {}).get('retry_after'),
+			)
+		return data['result']
+
+	def send_message(self, chat_id: str, text: str, *, parse_mode: str | None = None, max_wait: float | None = None) -> int:
+		"""
+		Args:
+			max_wait: Сколько секунд можно ждать лимитов (по умолчанию - `TELEGRAM_API_MAX_WAIT`).
+
+		Returns:
+			ID отправленного сообщения.
+
+		Raises:
+			TelegramAPIError: Telegram не принял сообщение или не ответил, либо отправку
+				пришлось отложить из-за лимитов (тогда в `retry_after` - через сколько повторить).
+		"""
+		payload = {"chat_id": chat_id, "text": text}
+		if parse_mode:
+			payload['parse_mode'] = parse_mode
+
+		self.rate_limiter.acquire(chat_id, max_wait = max_wait)
+		try:
+			return self._call('sendMessage', payload)['message_id']
+		except TelegramAPIError as e:
+			if e.status_code == 429 and e.retry_after:
+				self.rate_limiter.block(chat_id, e.retry_after)
+			raise
+
+	def close(self):
+		self._session.close()
+
+
+_clients: dict[str, TelegramBotClient] = {}
+_clients_lock = Lock()
+
+def get_client(token: str) -> TelegramBotClient:
+	"""Возвращает общий для процесса клиент бота (с общим пулом соединений)."""
+	if client := _clients.get(token):
+		return client
+
+	with _clients_lock:
+		if token not in _clients:
+			_clients[token] = TelegramBotClient(token)
+		return _clients[token]
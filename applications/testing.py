@@ -0,0 +1,160 @@
+"""
+Заглушки для тестов
+-------------------
+`FakeTelegramAPIServer` - локальный Bot API для тестов клиента Telegram и отправки
+уведомлений (см. `applications/tests.py`):
+```
+server = FakeTelegramAPIServer.start()
+client = TelegramBotClient(token, base_url = server.base_url)
+...
+server.stop()
+```
+"""
+
+from http.server 	import ThreadingHTTPServer, BaseHTTPRequestHandler
+from itertools 		import count
+from threading 		import Lock, Thread
+from collections 	import defaultdict
+import json, math, random, re, sys, time
+
+
+class FakeTelegramAPIServer(ThreadingHTTPServer):
+	"""
+	Заглушка Bot API: принимает `sendMessage` для любого токена и запоминает полученные
+	сообщения. Может добавлять задержку, случайные ошибки и, как настоящий API, отвечать
+	429 с `retry_after` при превышении лимитов. Ответы из `scripted_responses`
+	(HTTP код, тело) отдаются первыми, по одному на запрос.
+	"""
+	daemon_threads = True
+
+	def __init__(
+			self,
+			address: tuple[str, int],
+			*,
+			latency: float = 0,
+			fail_rate: float = 0,
+			bot_limit_per_second: int = 0,
+			chat_limit_per_minute: int = 0):
+		super().__init__(address, _FakeTelegramAPIHandler)
+		self.latency: float = latency
+		self.fail_rate: float = fail_rate
+		self.scripted_responses: list[tuple[int, dict]] = []
+		# (chat_id, текст) принятых сообщений и количество всех запросов
+		self.messages: list[tuple[str, str]] = []
+		self.requests_count: int = 0
+
+		# (окно в секундах, лимит за окно), 0 - без лимита
+		self._bot_limit: tuple[float, int] = (1, bot_limit_per_second)
+		self._chat_limit: tuple[float, int] = (60, chat_limit_per_minute)
+		self._sent: dict[str, list[float]] = defaultdict(list)
+
+		self._message_ids = count(1)
+		self._lock = Lock()
+
+	@classmethod
+	def start(cls, **kwargs) -> 'FakeTelegramAPIServer':
+		"""Запускает заглушку на свободном порту в фоновом потоке."""
+		server = cls(('127.0.0.1', 0), **kwargs)
+		Thread(target = server.serve_forever, daemon = True).start()
+		return server
+
+	def stop(self):
+		self.shutdown()
+		self.server_close()
+
+	def handle_error(self, request, client_address):
+		# Клиент не дождался ответа (проверка таймаутов) - не ошибка заглушки
+		if not isinstance(sys.exc_info()[1], ConnectionError):
+			super().handle_error(request, client_address)
+
+	@property
+	def base_url(self) -> str:
+		host, port = self.server_address[:2]
+		return f"http://{host}:{port}"
+
+	def next_message_id(self) -> int:
+		with self._lock:
+			return next(self._message_ids)
+
+	def next_request(self) -> tuple[int, dict] | None:
+		"""Учитывает запрос, возвращает заданный заранее ответ на него (если есть)."""
+		with self._lock:
+			self.requests_count += 1
+			return self.scripted_responses.pop(0) if self.scripted_responses else None
+
+	def _check_limit(self, key: str, limit: tuple[float, int], now: float) -> float:
+		window, max_count = limit
+		if not max_count:
+			return 0
+
+		sent = self._sent[key] = [at for at in self._sent[key] if at > now - window]
+		if len(sent) < max_count:
+			return 0
+		return sent[0] + window - now
+
+	def register_send(self, token: str, chat_id: str) -> int:
+		"""Returns: 0, если отправка разрешена, иначе `retry_after` в секундах."""
+		with self._lock:
+			now = time.monotonic()
+			retry_after = max(
+				self._check_limit(f"bot:{token}", self._bot_limit, now),
+				self._check_limit(f"chat:{token}:{chat_id}", self._chat_limit, now),
+			)
+			if retry_after:
+				return math.ceil(retry_after)
+
+			self._sent[f"bot:{token}"].append(now)
+			self._sent[f"chat:{token}:{chat_id}"].append(now)
+			return 0
+
+class _FakeTelegramAPIHandler(BaseHTTPRequestHandler):
+	server: FakeTelegramAPIServer
+	protocol_version = 'HTTP/1.1' # keep-alive, как у настоящего API
+	_PATH_REGEX = re.compile(r'^/bot(?P<token>[^/]+)/(?P<method>\w+)$')
+
+	def do_POST(self):
+		match = self._PATH_REGEX.match(self.path)
+		length = int(self.headers.get('Content-Length', 0))
+		payload: dict = json.loads(self.rfile.read(length) or b'{}')
+
+		scripted = self.server.next_request()
+		if self.server.latency:
+			time.sleep(self.server.latency)
+		if scripted:
+			return self._respond(*scripted)
+
+		if match is None or match['method'] != 'sendMessage':
+			return self._respond(404, {"ok": False, "error_code": 404, "description": "Not Found"})
+
+		if random.random() < self.server.fail_rate:
+			return self._respond(500, {"ok": False, "error_code": 500, "description": "Internal Server Error"})
+
+		if retry_after := self.server.register_send(match['token'], str(payload.get('chat_id'))):
+			return self._respond(429, {
+				"ok": False, "error_code": 429,
+				"description": f"Too Many Requests: retry after {retry_after}",
+				"parameters": {"retry_after": retry_after},
+			})
+
+		message_id = self.server.next_message_id()
+		with self.server._lock:
+			self.server.messages.append((str(payload.get('chat_id')), payload.get('text', '')))
+
+		self._respond(200, {"ok": True, "result": {
+			"message_id": message_id,
+			"date": int(time.time()),
+			"chat": {"id": payload.get('chat_id')},
+			"text": payload.get('text'),
+		}})
+
+	def _respond(self, status: int, data: dict):
+		body = json.dumps(data).encode()
+		self.send_response(status)
+		self.send_header('Content-Type', 'application/json')
+		self.send_header('Content-Length', str(len(body)))
+		self.end_headers()
+		self.wfile.write(body)
+
+	def log_message(self, format: str, *args):
+		pass
+
@@ -1,3 +1,313 @@
-from django.test import TestCase
+from unittest import mock
+import time
 
-# Create your tests here.
+from django.http 	import HttpResponse
+from django.test 	import SimpleTestCase, TestCase, RequestFactory
+
+from applications.models 	import Application
+from applications.telegram 	import TelegramBotClient, TelegramRateLimiter, TelegramAPIError
+from applications.testing 	import FakeTelegramAPIServer
+from content.models 		import Page
+from shared.db 				import read_replica
+from shared.rate_limiting 	import TokenBucket, token_bucket
+from shared.resilience 		import CircuitBreaker, CircuitState, circuit_breaker
+
+
+_TOKEN = '123456:' + 'a' * 35
+
+
+class FakeClock:
+	"""Подменяет модуль `time` в тестируемом модуле: время идёт только через `advance`."""
+	def __init__(self):
+		self.now: float = 1000
+
+	def monotonic(self) -> float:
+		return self.now
+
+	def advance(self, seconds: float):
+		self.now += seconds
+
+
+# MARK: Клиент Bot API
+class TelegramBotClientTests(SimpleTestCase):
+	def setUp(self):
+		self.server = FakeTelegramAPIServer.start()
+		self.addCleanup(self.server.stop)
+		self.client = TelegramBotClient(_TOKEN, base_url = self.server.base_url, timeout = (1, 0.5), max_retries = 2)
+		self.addCleanup(self.client.close)
+
+	def test_sends_message(self):
+		message_id = self.client.send_message('42', "Заявка")
+
+		self.assertEqual(message_id, 1)
+		self.assertEqual(self.server.messages, [('42', "Заявка")])
+
+	def test_retries_gateway_errors(self):
+		for status in (502, 503, 504):
+			with self.subTest(status = status):
+				self.server.requests_count = 0
+				self.server.scripted_responses = [(status, {"ok": False, "error_code": status, "description": "Gateway"})]
+
+				self.client.send_message('42', "Заявка")
+				self.assertEqual(self.server.requests_count, 2)
+
+	def test_gives_up_after_max_retries(self):
+		self.server.scripted_responses = [(503, {"ok": False, "error_code": 503, "description": "Unavailable"})] * 3
+
+		with self.assertRaises(TelegramAPIError) as raised:
+			self.client.send_message('42', "Заявка")
+		self.assertEqual(raised.exception.status_code, 503)
+		self.assertEqual(self.server.requests_count, 3)
+
+	def test_read_timeout_is_not_retried(self):
+		# Сообщение могло быть отправлено - повтор продублировал бы его
+		self.server.latency = 1
+
+		with self.assertRaises(TelegramAPIError) as raised:
+			self.client.send_message('42', "Заявка")
+		self.assertIsNone(raised.exception.status_code)
+		self.assertEqual(self.server.requests_count, 1)
+
+	def test_token_is_not_in_errors(self):
+		self.server.scripted_responses = [(400, {"ok": False, "error_code": 400, "description": f"Bad token {_TOKEN}"})]
+
+		with self.assertRaises(TelegramAPIError) as raised:
+			self.client.send_message('42', "Заявка")
+		self.assertNotIn(_TOKEN, str(raised.exception))
+
+	def test_too_many_requests_blocks_chat(self):
+		self.server.scripted_responses = [(429, {
+			"ok": False, "error_code": 429, "description": "Too Many Requests: retry after 7",
+			"parameters": {"retry_after": 7},
+		})]
+
+		with self.assertRaises(TelegramAPIError) as raised:
+			self.client.send_message('42', "Заявка")
+		self.assertEqual(raised.exception.status_code, 429)
+		self.assertEqual(raised.exception.retry_after, 7)
+
+		# Следующая отправка в этот чат откладывается без запроса к API
+		with self.assertRaises(TelegramAPIError) as raised:
+			self.client.send_message('42', "Заявка", max_wait = 0)
+		self.assertAlmostEqual(raised.exception.retry_after, 7, delta = 1)
+		self.assertEqual(self.server.requests_count, 1)
+
+		self.client.send_message('43', "Заявка")
+		self.assertEqual(self.server.messages, [('43', "Заявка")])
+
+
+# MARK: Лимиты
+class TokenBucketTests(SimpleTestCase):
+	def setUp(self):
+		self.clock = FakeClock()
+		patcher = mock.patch.object(token_bucket, 'time', self.clock)
+		patcher.start()
+		self.addCleanup(patcher.stop)
+
+	def test_burst_then_refill(self):
+		bucket = TokenBucket(rate = 2, capacity = 3)
+
+		self.assertEqual([bucket.try_acquire() for _ in range(4)], [True, True, True, False])
+		self.clock.advance(0.5)
+		self.assertTrue(bucket.try_acquire())
+		self.assertFalse(bucket.try_acquire())
+
+	def test_refill_is_capped_by_capacity(self):
+		bucket = TokenBucket(rate = 10, capacity = 2)
+		self.clock.advance(100)
+
+		self.assertEqual([bucket.try_acquire() for _ in range(3)], [True, True, False])
+
+	def test_reserve_returns_wait(self):
+		bucket = TokenBucket(rate = 2, capacity = 1)
+
+		self.assertEqual(bucket.reserve(), 0)
+		self.assertEqual(bucket.reserve(), 0.5)
+		self.assertEqual(bucket.reserve(), 1)
+
+		bucket.release()
+		self.assertEqual(bucket.reserve(), 1)
+
+	def test_block_for(self):
+		bucket = TokenBucket(rate = 100, capacity = 10)
+		bucket.block_for(5)
+
+		self.assertFalse(bucket.try_acquire())
+		self.assertEqual(bucket.reserve(), 5)
+		self.assertFalse(bucket.idle)
+
+		self.clock.advance(5)
+		self.assertTrue(bucket.try_acquire())
+
+	def test_invalid_arguments(self):
+		with self.assertRaises(ValueError):
+			TokenBucket(rate = 0, capacity = 1)
+		with self.assertRaises(ValueError):
+			TokenBucket(rate = 1, capacity = 0.5)
+
+
+class TelegramRateLimiterTests(SimpleTestCase):
+	def test_defers_past_max_wait(self):
+		limiter = TelegramRateLimiter(private_rate = 1, max_wait = 0.5)
+		self.assertEqual(limiter.acquire('42'), 0)
+
+		with self.assertRaises(TelegramAPIError) as raised:
+			limiter.acquire('42')
+		self.assertEqual(raised.exception.status_code, 429)
+		self.assertAlmostEqual(raised.exception.retry_after, 1, delta = 0.1)
+		self.assertEqual(limiter.metrics()['deferred'], 1)
+
+		# Отложенная отправка не расходует лимит - ожидание не растёт
+		with self.assertRaises(TelegramAPIError) as raised:
+			limiter.acquire('42')
+		self.assertAlmostEqual(raised.exception.retry_after, 1, delta = 0.1)
+
+	def test_waits_within_max_wait(self):
+		limiter = TelegramRateLimiter(private_rate = 20, max_wait = 1)
+		limiter.acquire('42')
+
+		started_at = time.monotonic()
+		wait = limiter.acquire('42')
+		self.assertGreater(wait, 0)
+		self.assertGreaterEqual(time.monotonic() - started_at, wait * 0.9)
+		self.assertEqual(limiter.metrics()['waits'], 1)
+
+	def test_max_wait_override_does_not_sleep(self):
+		limiter = TelegramRateLimiter(private_rate = 20, max_wait = 30)
+		limiter.acquire('42')
+
+		with mock.patch('applications.telegram.time.sleep') as sleep, self.assertRaises(TelegramAPIError):
+			limiter.acquire('42', max_wait = 0)
+		sleep.assert_not_called()
+
+	def test_chats_are_limited_separately(self):
+		limiter = TelegramRateLimiter(private_rate = 1, group_rate_per_minute = 1, max_wait = 0)
+		limiter.acquire('42')
+
+		self.assertEqual(limiter.acquire('43'), 0)
+		self.assertEqual(limiter.acquire('-100'), 0)
+		with self.assertRaises(TelegramAPIError) as raised:
+			limiter.acquire('-100')
+		self.assertAlmostEqual(raised.exception.retry_after, 60, delta = 1)
+
+
+# MARK: Circuit breaker
+class CircuitBreakerTests(SimpleTestCase):
+	def setUp(self):
+		self.clock = FakeClock()
+		patcher = mock.patch.object(circuit_breaker, 'time', self.clock)
+		patcher.start()
+		self.addCleanup(patcher.stop)
+		self.breaker = CircuitBreaker(failure_threshold = 3, recovery_timeout = 10, half_open_max_calls = 1)
+
+	def _open(self):
+		for _ in range(3):
+			self.breaker.record_failure()
+
+	def test_opens_after_threshold(self):
+		self.breaker.record_failure()
+		self.breaker.record_failure()
+		self.assertIs(self.breaker.state, CircuitState.CLOSED)
+		self.assertTrue(self.breaker.allow_request())
+
+		self.breaker.record_failure()
+		self.assertIs(self.breaker.state, CircuitState.OPEN)
+		self.assertFalse(self.breaker.allow_request())
+		self.assertEqual(self.breaker.retry_after, 10)
+
+	def test_success_resets_failures(self):
+		self.breaker.record_failure()
+		self.breaker.record_failure()
+		self.breaker.record_success()
+		self.breaker.record_failure()
+
+		self.assertIs(self.breaker.state, CircuitState.CLOSED)
+
+	def test_half_open_after_recovery_timeout(self):
+		self._open()
+		self.clock.advance(9)
+		self.assertIs(self.breaker.state, CircuitState.OPEN)
+		self.assertEqual(self.breaker.retry_after, 1)
+
+		self.clock.advance(1)
+		self.assertIs(self.breaker.state, CircuitState.HALF_OPEN)
+		self.assertTrue(self.breaker.allow_request())
+		# Пробный вызов один - остальные ждут его результата
+		self.assertFalse(self.breaker.allow_request())
+
+	def test_half_open_success_closes(self):
+		self._open()
+		self.clock.advance(10)
+		self.breaker.allow_request()
+		self.breaker.record_success()
+
+		self.assertIs(self.breaker.state, CircuitState.CLOSED)
+		self.assertTrue(self.breaker.allow_request())
+
+	def test_half_open_failure_opens_again(self):
+		self._open()
+		self.clock.advance(10)
+		self.breaker.allow_request()
+		self.breaker.record_failure()
+
+		self.assertIs(self.breaker.state, CircuitState.OPEN)
+		self.assertEqual(self.breaker.retry_after, 10)
+
+	def test_trip(self):
+		self.breaker.trip()
+		self.assertIs(self.breaker.state, CircuitState.OPEN)
+
+
+# MARK: Чтение с реплики
+@mock.patch.object(read_replica, '_get_replica_alias', return_value = 'replica')
+class ReadReplicaStickinessTests(TestCase):
+	def setUp(self):
+		self.router = read_replica.ReadReplicaRouter()
+		self.factory = RequestFactory()
+		self.read_databases: list[str] = []
+
+	def _handle(self, request, *, write: bool = False) -> HttpResponse:
+		def view(request):
+			if write:
+				Application.objects.create(requestener_name = "Иван", settlement = "Москва", phone_number = '+79991234567')
+			self.read_databases.append(self.router.db_for_read(Page))
+			return HttpResponse()
+
+		with self.settings(READ_REPLICA_APPS = {'content'}, READ_REPLICA_STICKINESS = 5):
+			return read_replica.ReadReplicaStickinessMiddleware(view)(request)
+
+	def test_reads_from_replica(self, _):
+		response = self._handle(self.factory.get('/'))
+
+		self.assertEqual(self.read_databases, ['replica'])
+		self.assertNotIn('primary_db_until', response.cookies)
+
+	def test_write_pins_request_and_sets_cookie(self, _):
+		# POST без записи не привязывает к основной базе, запись в GET - привязывает
+		response = self._handle(self.factory.post('/'))
+		self.assertNotIn('primary_db_until', response.cookies)
+
+		response = self._handle(self.factory.get('/'), write = True)
+		self.assertEqual(self.read_databases, ['replica', 'default'])
+		self.assertGreater(int(response.cookies['primary_db_until'].value), time.time())
+
+	def test_cookie_pins_next_requests(self, _):
+		response = self._handle(self.factory.get('/'), write = True)
+
+		request = self.factory.get('/')
+		request.COOKIES['primary_db_until'] = response.cookies['primary_db_until'].value
+		self._handle(request)
+		self.assertEqual(self.read_databases, ['default', 'default'])
+
+	def test_expired_cookie_is_ignored(self, _):
+		request = self.factory.get('/')
+		request.COOKIES['primary_db_until'] = str(int(time.time()) - 1)
+		self._handle(request)
+
+		self.assertEqual(self.read_databases, ['replica'])
+
+	def test_pin_does_not_leak_between_requests(self, _):
+		self._handle(self.factory.get('/'), write = True)
+		self._handle(self.factory.get('/'))
+
+		self.assertEqual(self.read_databases, ['default', 'replica'])
@@ -0,0 +1,78 @@
+"""
+Ограничение частоты заявок
+--------------------------
+Защита формы заявки от флуда: не больше `APPLICATIONS_THROTTLE_PER_IP` заявок с одного IP
+и `APPLICATIONS_THROTTLE_PER_PHONE` на один номер телефона за период. Проверка идёт до
+валидации формы, без запросов к БД и рендеринга шаблонов (см. `MainPageView.post`).
+
+`APPLICATIONS_THROTTLE_BACKEND`: `'memory'` - лимиты в памяти процесса, `'cache'` - в кэше
+Django (общие для всех процессов, если кэш общий).
+"""
+
+from threading import Lock
+import logging
+
+from django.conf 	import settings
+from django.http 	import HttpRequest
+
+import phonenumbers
+
+from shared.rate_limiting import KeyedRateLimiter, MemoryRateLimiter, CacheRateLimiter
+
+
+_logger = logging.getLogger(__name__)
+
+
+def _make_limiter(name: str, limit: int, period: float) -> KeyedRateLimiter:
+	if getattr(settings, 'APPLICATIONS_THROTTLE_BACKEND', 'memory') == 'cache':
+		return CacheRateLimiter(limit, period, prefix = f"applications-throttle:{name}")
+	return MemoryRateLimiter(limit, period)
+
+_limiters: dict[str, KeyedRateLimiter] = {
+	'ip': _make_limiter('ip', *getattr(settings, 'APPLICATIONS_THROTTLE_PER_IP', (10, 60))),
+	'phone': _make_limiter('phone', *getattr(settings, 'APPLICATIONS_THROTTLE_PER_PHONE', (3, 10 * 60))),
+}
+
+_rejected: dict[str, int] = {name: 0 for name in _limiters}
+_rejected_lock = Lock()
+
+
+def _get_client_ip(request: HttpRequest) -> str:
+	# За reverse proxy - заголовок с реальным IP, например 'HTTP_X_REAL_IP'
+	header = getattr(settings, 'APPLICATIONS_THROTTLE_IP_HEADER', None)
+	if header and (ip := request.META.get(header)):
+		return ip.split(',')[0].strip()
+	return request.META.get('REMOTE_ADDR', '')
+
+def _get_phone_number(request: HttpRequest) -> str | None:
+	"""Номер из формы в E.164 (как в БД), `None` - если это не номер."""
+	try:
+		phone_number = phonenumbers.parse(request.POST.get('phone_number', ''), settings.PHONENUMBER_DEFAULT_REGION)
+	except phonenumbers.NumberParseException:
+		return None
+	return phonenumbers.format_number(phone_number, phonenumbers.PhoneNumberFormat.E164)
+
+def check_submission(request: HttpRequest) -> float:
+	"""
+	Засчитывает отправку формы заявки.
+
+	Returns:
+		0, если отправка разрешена, иначе - через сколько секунд можно повторить.
+	"""
+	keys = {'ip': _get_client_ip(request), 'phone': _get_phone_number(request)}
+
+	for name, key in keys.items():
+		if not key:
+			continue
+
+		if retry_after := _limiters[name].hit(key):
+			with _rejected_lock:
+				_rejected[name] += 1
+			_logger.debug(f"Заявка отклонена: превышен лимит по {name}")
+			return retry_after
+	return 0
+
+def get_rejected_counts() -> dict[str, int]:
+	"""Сколько отправок формы отклонено этим процессом: по IP (`ip`) и по номеру телефона (`phone`)."""
+	with _rejected_lock:
+		return dict(_rejected)
@@ -0,0 +1,8 @@
+from django.urls 	import path
+from applications 	import views
+
+urlpatterns = [
+	path('bulk', views.BulkApplicationsView.as_view(), name = 'applications_bulk'),
+	path('search', views.ApplicationSearchView.as_view(), name = 'applications_search'),
+	path('settlements', views.SettlementSuggestionsView.as_view(), name = 'applications_settlements'),
+]
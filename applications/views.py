@@ -1,3 +1,200 @@
-from django.shortcuts import render
+"""
+API для партнёров
+-----------------
+`POST /api/applications/bulk` - массовая загрузка заявок. Авторизация - заголовок
+`Authorization: Bearer <токен>` (см. `IntegrationPartner`).
 
-# Create your views here.
+Тело запроса - JSON-массив объектов (`Content-Type: application/json`), либо по объекту
+на строку (`Content-Type: application/x-ndjson`). Поля - как у формы заявки:
+`requestener_name`, `settlement`, `phone_number`.
+
+Каждая строка проверяется `ApplicationForm`. Корректные строки сохраняются одной
+транзакцией (`applications.writing.create_applications`), ошибки возвращаются построчно
+(номер строки - с нуля, пустые строки NDJSON не считаются). Строка NDJSON с некорректным
+JSON - ошибка этой строки, остальные строки сохраняются.
+Повторные заявки (см. `applications.duplicates`) сохраняются, но уведомления о них не отправляются:
+```
+{"created": 2, "duplicates": 0, "errors": [{"row": 1, "errors": {"phone_number": [...]}}]}
+```
+
+Подсказки населённых пунктов
+----------------------------
+`GET /api/applications/settlements?q=<начало названия>` - для поля формы заявки, без
+авторизации и без запросов к БД (см. `applications.settlements`): `{"results": ["Москва", ...]}`
+
+Поиск заявок
+------------
+`GET /api/applications/search?q=<запрос>&limit=<до 100>` - для сотрудников с правом просмотра
+заявок (сессия админки), по убыванию релевантности (см. `applications.search`):
+```
+{"results": [{"id": 1, "requestener_name": "...", "settlement": "...", "phone_number": "+7...", "date": "..."}]}
+```
+"""
+
+from hashlib 	import sha256
+from threading 	import Lock
+from os 		import getenv
+import json, logging, time
+
+from django.conf 				import settings
+from django.core.exceptions 	import RequestDataTooBig
+from django.http 				import HttpRequest, JsonResponse
+from django.utils.decorators 	import method_decorator
+from django.views 				import View
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.cache import cache_control
+
+from applications.forms 	import ApplicationForm
+from applications 			import settlements, search
+from applications.models 	import Application, IntegrationPartner
+from applications.writing 	import create_applications
+
+
+_logger = logging.getLogger(__name__)
+
+_MAX_ROWS: int = getattr(settings, 'APPLICATIONS_BULK_MAX_ROWS', 1000)
+_MAX_SUGGESTIONS = 10
+_MAX_SEARCH_RESULTS = 100
+# Новые партнёры (и смена токенов в ENV) подхватываются не чаще, чем раз в столько секунд
+_PARTNERS_REFRESH_INTERVAL = 10
+
+
+# Хэш токена -> id партнёра. Токены хранятся в ENV-переменных, а не в БД, поэтому
+# соответствие строится в памяти процесса - запрос с токеном не перебирает всех партнёров
+_partner_ids_by_token_hash: dict[bytes, int] = {}
+_partners_refreshed_at: float = 0
+_partners_lock = Lock()
+
+def _refresh_partner_tokens():
+	global _partner_ids_by_token_hash, _partners_refreshed_at
+	with _partners_lock:
+		if time.monotonic() - _partners_refreshed_at < _PARTNERS_REFRESH_INTERVAL:
+			return
+
+		_partner_ids_by_token_hash = {
+			sha256(token.encode()).digest(): partner.pk
+			for partner in IntegrationPartner.objects.filter(is_active = True)
+			if (token := getenv(partner.token_env_variable_name))
+		}
+		_partners_refreshed_at = time.monotonic()
+
+def _get_partner(request: HttpRequest) -> IntegrationPartner | None:
+	scheme, _, token = request.headers.get('Authorization', '').partition(' ')
+	token = token.strip()
+	if scheme.lower() != 'bearer' or not token:
+		return None
+
+	token_hash = sha256(token.encode()).digest()
+	if token_hash not in _partner_ids_by_token_hash:
+		_refresh_partner_tokens()
+	if (partner_id := _partner_ids_by_token_hash.get(token_hash)) is None:
+		return None
+
+	# Отключение партнёра и смена токена действуют сразу
+	partner = IntegrationPartner.objects.filter(pk = partner_id, is_active = True).first()
+	return partner if partner and partner.check_token(token) else None
+
+def _parse_line(line: str):
+	try:
+		return json.loads(line)
+	except ValueError as e:
+		return e
+
+def _parse_rows(request: HttpRequest) -> list:
+	"""
+	Returns:
+		Строки запроса. Строка NDJSON с некорректным JSON - `ValueError` вместо значения.
+
+	Raises:
+		ValueError: Тело запроса не является JSON-массивом / NDJSON.
+	"""
+	if request.content_type in ('application/x-ndjson', 'application/jsonl'):
+		return [_parse_line(line) for line in request.body.decode().splitlines() if line.strip()]
+
+	rows = json.loads(request.body)
+	if not isinstance(rows, list):
+		raise ValueError("Ожидается JSON-массив")
+	return rows
+
+
+@method_decorator(csrf_exempt, name = 'dispatch')
+class BulkApplicationsView(View):
+	http_method_names = ['post']
+
+	def post(self, request: HttpRequest):
+		partner = _get_partner(request)
+		if partner is None:
+			response = JsonResponse({"error": "Неверный или отсутствующий токен"}, status = 401)
+			response['WWW-Authenticate'] = 'Bearer'
+			return response
+
+		try:
+			rows = _parse_rows(request)
+		except RequestDataTooBig:
+			return JsonResponse({"error": "Слишком большой запрос"}, status = 413)
+		except (ValueError, UnicodeDecodeError) as e:
+			return JsonResponse({"error": f"Некорректное тело запроса: {e}"}, status = 400)
+
+		if len(rows) > _MAX_ROWS:
+			return JsonResponse({"error": f"Не больше {_MAX_ROWS} заявок за запрос"}, status = 413)
+
+		applications: list[Application] = []
+		errors: list[dict] = []
+		for i, row in enumerate(rows):
+			if isinstance(row, ValueError):
+				errors.append({"row": i, "errors": {"__all__": [{"message": f"Некорректный JSON: {row}", "code": "invalid"}]}})
+				continue
+			if not isinstance(row, dict):
+				errors.append({"row": i, "errors": {"__all__": [{"message": "Ожидается объект", "code": "invalid"}]}})
+				continue
+
+			form = ApplicationForm(data = row)
+			if form.is_valid():
+				applications.append(form.save(commit = False))
+			else:
+				errors.append({"row": i, "errors": form.errors.get_json_data()})
+
+		if applications:
+			create_applications(applications)
+		duplicates = sum(application.duplicate_of_id is not None for application in applications)
+
+		_logger.info(
+			f"{partner}: загружено заявок {len(applications)} (повторов {duplicates}), с ошибками {len(errors)}")
+		return JsonResponse(
+			{"created": len(applications), "duplicates": duplicates, "errors": errors},
+			status = 400 if errors and not applications else 200,
+		)
+
+
+@method_decorator(cache_control(public = True, max_age = 5 * 60), name = 'dispatch')
+class SettlementSuggestionsView(View):
+	http_method_names = ['get']
+
+	def get(self, request: HttpRequest):
+		prefix = request.GET.get('q', '')[:64]
+		return JsonResponse({"results": settlements.suggest(prefix, _MAX_SUGGESTIONS)})
+
+
+class ApplicationSearchView(View):
+	http_method_names = ['get']
+
+	def get(self, request: HttpRequest):
+		if not request.user.has_perm('applications.view_application'):
+			return JsonResponse({"error": "Нет доступа"}, status = 403)
+
+		try:
+			limit = min(max(int(request.GET.get('limit', 20)), 1), _MAX_SEARCH_RESULTS)
+		except ValueError:
+			return JsonResponse({"error": "limit должен быть числом"}, status = 400)
+
+		applications = search.search_applications(request.GET.get('q', '')[:256], limit)
+		return JsonResponse({"results": [
+			{
+				"id": application.pk,
+				"requestener_name": application.requestener_name,
+				"settlement": application.settlement,
+				"phone_number": str(application.phone_number),
+				"date": application.date.isoformat(),
+			}
+			for application in applications
+		]})
@@ -0,0 +1,79 @@
+"""
+Сохранение заявок пачками
+-------------------------
+`create_applications` сохраняет несколько заявок одной транзакцией: отмечает повторы,
+делает `bulk_create` и отправляет `applications_bulk_created` (уведомления - одной
+пачкой, счётчик заявок).
+
+Режим group commit (`APPLICATIONS_GROUP_COMMIT`): заявки из формы не сохраняются каждая
+своей транзакцией, а передаются в `application_writer`, который сохраняет их пачками
+(до `APPLICATIONS_GROUP_COMMIT_MAX_BATCH` заявок или раз в `APPLICATIONS_GROUP_COMMIT_MAX_DELAY`
+секунд). Запрос ждёт, пока его пачка не будет сохранена, поэтому при наплыве заявок
+количество коммитов (и fsync) растёт медленнее количества заявок. Если запись заявки не
+началась за `APPLICATIONS_GROUP_COMMIT_TIMEOUT` секунд (очередь писателя не успевает),
+она снимается с очереди и сохраняется сразу, своей транзакцией.
+"""
+
+import logging
+
+from django.conf 	import settings
+from django.db 		import transaction
+
+from applications.duplicates 	import mark_duplicates
+from applications.models 		import Application
+from applications.signals 		import applications_bulk_created
+from shared.background 			import BatchWriter
+
+
+_logger = logging.getLogger(__name__)
+
+
+def _reset_unsaved(application: Application):
+	# После отката неудачной пачки у заявок остаются pk, `_state.adding = False` и ссылки
+	# на повторы из той же пачки - а этих строк в БД уже нет
+	application.pk = None
+	application._state.adding = True
+	application.duplicate_of = None
+
+def create_applications(applications: list[Application]) -> list[Application]:
+	"""
+	Сохраняет ещё не сохранённые заявки одной транзакцией. Можно повторно вызывать для
+	тех же заявок после ошибки (так `application_writer` сохраняет по одной заявки из
+	неудачной пачки).
+
+	Returns:
+		Те же заявки (с заполненными pk), в том же порядке.
+	"""
+	for application in applications:
+		_reset_unsaved(application)
+
+	with transaction.atomic():
+		# Повторы могут ссылаться на заявки из этой же пачки - сохраняются после них
+		originals, duplicates = mark_duplicates(applications)
+		Application.objects.bulk_create(originals)
+		Application.objects.bulk_create(duplicates)
+		applications_bulk_created.send(sender = Application, applications = applications)
+	return applications
+
+
+application_writer: BatchWriter[Application, Application] = BatchWriter(
+	'applications-writer',
+	create_applications,
+	max_batch_size = getattr(settings, 'APPLICATIONS_GROUP_COMMIT_MAX_BATCH', 50),
+	max_delay = getattr(settings, 'APPLICATIONS_GROUP_COMMIT_MAX_DELAY', 0.02),
+	logger = _logger,
+)
+
+def save_application(application: Application) -> Application:
+	"""Сохраняет заявку из формы: через `application_writer` в режиме group commit, иначе - сразу."""
+	if getattr(settings, 'APPLICATIONS_GROUP_COMMIT', False):
+		try:
+			return application_writer.write(application, timeout = getattr(settings, 'APPLICATIONS_GROUP_COMMIT_TIMEOUT', 2))
+		except TimeoutError:
+			# Заявка снята с очереди писателя и не будет им сохранена
+			_logger.warning('Application writer queue is too slow, saving application directly.')
+
+	# Заявка и запись outbox уведомления сохраняются атомарно (см. applications.signals)
+	with transaction.atomic():
+		application.save()
+	return application
@@ -11,3 +11,5 @@ class ContentConfig(AppConfig):
 	def ready(self):
 		from shared.rendering import render_data
 		render_data.init_page_render_data_class()
+
+		import content.signals
@@ -0,0 +1,131 @@
+"""
+Заранее собранные robots.txt и sitemap.xml
+------------------------------------------
+Тела документов собираются один раз и хранятся в памяти процесса вместе с версией
+данных - временем изменения `SiteSettings` и страниц (`updated_at`, удаление страницы
+отмечается в настройках сайта, см. `content/signals.py`). На запрос краулера - только
+проверка версии (два запроса по первичному ключу / крошечной таблице страниц), без сборки
+документа и шаблонизатора. Изменения, сохранённые любым процессом, видны всем процессам.
+
+Адрес сайта в документах - `SITE_BASE_URL`, если не задан - из запроса (тогда документы
+хранятся не более чем для `_MAX_BASE_URLS` адресов).
+
+Last-Modified - время изменения данных (`updated_at`), поэтому одинаков во всех процессах
+и не меняется при перезапуске.
+"""
+
+from xml.sax.saxutils 	import escape
+from hashlib 			import sha256
+from datetime 			import datetime
+from threading 			import Lock
+
+from django.conf 		import settings
+from django.db 			import DEFAULT_DB_ALIAS
+from django.db.models 	import Max
+
+from content.models import SiteSettings, Page
+
+
+class PrebuiltDocument:
+	def __init__(self, body: str, last_modified: datetime):
+		self.body: bytes = body.encode()
+		self.etag: str = f'"{sha256(self.body).hexdigest()[:32]}"'
+		self.last_modified: datetime = last_modified
+
+
+_MAX_BASE_URLS = 8
+
+# (тип документа, базовый URL сайта) -> (версия данных, документ)
+_documents: dict[tuple[str, str], tuple[tuple, PrebuiltDocument]] = {}
+_documents_lock = Lock()
+
+
+def _get_pages():
+	# Документ кэшируется до следующего изменения - строится по основной базе, не по реплике
+	return Page.objects.using(DEFAULT_DB_ALIAS)
+
+def _get_page_paths() -> list[str]:
+	# Импорт здесь, так как content.urls импортирует views, а они - этот модуль
+	from django.urls 	import reverse
+	from content.urls 	import urlpatterns
+
+	# Страницы, которые не нужно индексировать (например, "спасибо за заявку"), - с _in_sitemap = False
+	url_names_by_file_name: dict[str, str] = {
+		view_class._file_name: pattern.name
+		for pattern in urlpatterns
+		if (view_class := getattr(pattern.callback, 'view_class', None))
+		and getattr(view_class, '_file_name', None)
+		and getattr(view_class, '_in_sitemap', True)
+	}
+
+	return [
+		reverse(url_names_by_file_name[file_name])
+		for file_name in _get_pages().order_by('pk').values_list('file_name', flat = True)
+		if file_name in url_names_by_file_name
+	]
+
+def _build_sitemap_xml(base_url: str) -> tuple[str, datetime]:
+	urls = ''.join(
+		f"\t<url><loc>{escape(base_url + path)}</loc></url>\n"
+		for path in _get_page_paths()
+	)
+	# Удаление страницы отмечается в SiteSettings.updated_at (см. content.signals)
+	last_modified = max(filter(None, (
+		_get_pages().aggregate(last_modified = Max('updated_at'))['last_modified'],
+		SiteSettings.get_solo().updated_at,
+	)))
+	return (
+		'<?xml version="1.0" encoding="UTF-8"?>\n'
+		'<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">\n'
+		f"{urls}"
+		'</urlset>\n'
+	), last_modified
+
+def _build_robots_txt(base_url: str) -> tuple[str, datetime]:
+	from django.urls import reverse
+
+	site_settings = SiteSettings.get_solo()
+	content = site_settings.robots_txt_content.strip() or "User-agent: *\nAllow: /"
+	if 'sitemap:' not in content.lower():
+		content += f"\n\nSitemap: {base_url}{reverse('sitemap_xml')}"
+
+	return content + '\n', site_settings.updated_at
+
+_builders = {
+	'robots.txt': _build_robots_txt,
+	'sitemap.xml': _build_sitemap_xml,
+}
+
+
+def _get_version() -> tuple:
+	"""Время последнего изменения (настроек сайта, страниц) - по основной базе."""
+	return (
+		SiteSettings.objects.using(DEFAULT_DB_ALIAS).values_list('updated_at', flat = True).first(),
+		_get_pages().aggregate(last_modified = Max('updated_at'))['last_modified'],
+	)
+
+def get_document(kind: str, base_url: str) -> PrebuiltDocument:
+	"""
+	Возвращает документ (`robots.txt` / `sitemap.xml`), собирая его заново, только если
+	данные изменились с прошлой сборки.
+
+	Args:
+		base_url: Адрес сайта из запроса (схема + хост, без завершающего `/`), используется,
+			если не задан `SITE_BASE_URL`.
+	"""
+	base_url = (getattr(settings, 'SITE_BASE_URL', None) or base_url).rstrip('/')
+	key = (kind, base_url)
+	version = _get_version()
+	if (cached := _documents.get(key)) and cached[0] == version:
+		return cached[1]
+
+	with _documents_lock:
+		cached = _documents.get(key)
+		if not cached or cached[0] != version:
+			# Адрес из заголовка Host - не даём словарю расти без ограничений
+			if key not in _documents and len(_documents) >= _MAX_BASE_URLS * len(_builders):
+				_documents.clear()
+
+			body, last_modified = _builders[kind](base_url)
+			cached = _documents[key] = (version, PrebuiltDocument(body, last_modified.replace(microsecond = 0)))
+		return cached[1]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.4 on 2026-10-19 07:37
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('content', '0011_rename_recruitersbranches_recruitersbranche'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='sitesettings',
+            name='site_favicon',
+            field=models.ImageField(blank=True, upload_to='icons', verbose_name='Favicon сайта'),
+        ),
+        migrations.AlterField(
+            model_name='sitesettings',
+            name='site_video',
+            field=models.FileField(blank=True, upload_to='videos', verbose_name='Видео'),
+        ),
+    ]
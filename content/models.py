@@ -1,5 +1,4 @@
 from django.db import models
-from django.conf import settings
 
 from ordered_model.models import OrderedModel
 from solo.models          import SingletonModel
@@ -13,11 +12,13 @@ _HTML_ADDITION_HELP_TEXT = "Этот текст будет добавлен в 
 
 @render_data.register_model_for_page_render_data
 class SiteSettings(SingletonModel):
-	site_favicon       = models.ImageField(blank = True, verbose_name = "Favicon сайта", upload_to = settings.MEDIA_ROOT / "icons")
-	site_video         = models.FileField(blank = True, verbose_name = "Видео", upload_to = settings.MEDIA_ROOT / "videos")
+	site_favicon       = models.ImageField(blank = True, verbose_name = "Favicon сайта", upload_to = "icons")
+	site_video         = models.FileField(blank = True, verbose_name = "Видео", upload_to = "videos")
 	robots_txt_content = models.TextField(blank = True, verbose_name = "Содержимое Robots.txt")
 	html_head_addition = models.TextField(blank = True, verbose_name = "Добавить в <head>", help_text = _HTML_ADDITION_HELP_TEXT)
 	html_body_addition = models.TextField(blank = True, verbose_name = "Добавить в <body>", help_text = _HTML_ADDITION_HELP_TEXT)
+	# Last-Modified для robots.txt и sitemap.xml (см. content.crawlers)
+	updated_at         = models.DateTimeField(auto_now = True, verbose_name = "Изменено")
 
 	class Meta:
 		verbose_name = "Настройки сайта"
@@ -104,6 +105,7 @@ class Page(models.Model):
 	name = models.CharField(verbose_name = "Название")
 	title = models.CharField(help_text = "Название вкладки в браузере")
 	ceo_content = HTMLField(verbose_name = "CEO контент", blank = True)
+	updated_at = models.DateTimeField(auto_now = True, verbose_name = "Изменено")
 
 	class Meta:
 		verbose_name = "Страница"
@@ -0,0 +1,27 @@
+from django.db.models.signals 	import post_save, post_delete
+from django.dispatch 			import receiver
+from django.utils 				import timezone
+
+from django_cleanup.signals import cleanup_pre_delete
+
+from content.models 	import SiteSettings, Page
+from shared.imaging 	import generate_derivatives, delete_derivatives
+
+
+@receiver(post_save, sender = SiteSettings)
+def generate_favicon_derivatives(sender, instance: SiteSettings, **kwargs):
+	# Уже сгенерированные копии пропускаются, так что лишней работы при обычном сохранении нет
+	generate_derivatives(instance.site_favicon, ('favicon_16', 'favicon_32', 'apple_touch_icon'))
+
+@receiver(cleanup_pre_delete)
+def delete_image_derivatives(sender, file, **kwargs):
+	# django_cleanup удаляет заменённый/удалённый файл - вместе с ним удаляем и его копии
+	if file.name.lower().endswith(('.png', '.jpg', '.jpeg', '.webp', '.gif', '.ico', '.bmp')):
+		delete_derivatives(file)
+
+
+@receiver(post_delete, sender = Page)
+def touch_site_settings(sender, **kwargs):
+	# У удалённой страницы нет updated_at - время изменения sitemap.xml (и версия заранее
+	# собранных документов, см. content.crawlers) берётся из настроек сайта
+	SiteSettings.objects.update(updated_at = timezone.now())
@@ -0,0 +1,15 @@
+from django import template
+from django.db.models.fields.files import FieldFile
+
+from shared.imaging import get_derivative_url
+
+
+register = template.Library()
+
+@register.simple_tag
+def derivative_url(field_file: FieldFile, spec_name: str) -> str:
+	"""
+	URL уменьшенной/пережатой копии изображения (см. `shared.imaging.derivatives`).<br>
+	`{% derivative_url data.site_settings.site_favicon 'favicon_32' %}`
+	"""
+	return get_derivative_url(field_file, spec_name)
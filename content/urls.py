@@ -5,4 +5,7 @@ urlpatterns = [
 	path('', 		views.MainPageView.as_view(), 	name = 'main'),
 	path('legal', 	views.LegalPageView.as_view(), 	name = 'legal'),
 	path('success', views.SuccessPageView.as_view(),name = 'success'),
+
+	path('robots.txt', 	views.RobotsTxtView.as_view(), 	name = 'robots_txt'),
+	path('sitemap.xml', views.SitemapXmlView.as_view(), name = 'sitemap_xml'),
 ]
@@ -1,13 +1,17 @@
 from functools import cached_property
+from math import ceil
 from pathlib import Path
 import logging
 
-from django.http 			import HttpRequest
+from django.http 			import HttpRequest, HttpResponse
 from django.shortcuts 		import render, redirect
+from django.utils.cache 	import get_conditional_response, patch_cache_control
+from django.utils.http 		import http_date
 from django.views 			import View
 
 from applications.forms import ApplicationForm
-from content 			import models
+from applications 		import throttling, writing
+from content 			import models, crawlers
 from shared.rendering 	import PageRenderData
 
 
@@ -21,6 +25,8 @@ _logger = logging.getLogger(__name__)
 class BasePageView(View):
 	_file_folder: str = 'content'
 	_file_name: str | None = None
+	# Показывать ли страницу в sitemap.xml
+	_in_sitemap: bool = True
 
 	def __init_subclass__(cls):
 		if cls is BasePageView:
@@ -61,10 +67,25 @@ class MainPageView(BasePageView):
 		return render(request, self._template_name, {'data': data, 'form': form})
 
 	def post(self, request: HttpRequest):
+		# До формы, БД и шаблонов - чтобы флуд обходился как можно дешевле
+		if retry_after := throttling.check_submission(request):
+			response = HttpResponse("Слишком много заявок, попробуйте позже.", status = 429,
+				content_type = 'text/plain; charset=utf-8')
+			response['Retry-After'] = str(ceil(retry_after))
+			return response
+
 		form = ApplicationForm(request.POST)
 
 		if form.is_valid():
-			form.save()
+			# Повторная отправка той же формы - отвечаем так же, как в первый раз, ничего не сохраняя
+			if not form.claim_submission():
+				return redirect('success')
+
+			try:
+				writing.save_application(form.save(commit = False))
+			except Exception:
+				form.release_submission()
+				raise
 			return redirect('success')
 
 		data = self._get_page_render_data()
@@ -73,6 +94,34 @@ class MainPageView(BasePageView):
 
 class SuccessPageView(BasePageView):
 	_file_name = 'success'
+	_in_sitemap = False
 
 class LegalPageView(BasePageView):
 	_file_name = 'legal'
+
+
+# MARK: Crawlers
+class PrebuiltDocumentView(View):
+	_document_kind: str
+	_content_type: str
+
+	def get(self, request: HttpRequest):
+		document = crawlers.get_document(self._document_kind, request.build_absolute_uri('/').rstrip('/'))
+		last_modified = int(document.last_modified.timestamp())
+
+		response = get_conditional_response(request, etag = document.etag, last_modified = last_modified)
+		if response is None:
+			response = HttpResponse(document.body, content_type = self._content_type)
+
+		response['ETag'] = document.etag
+		response['Last-Modified'] = http_date(last_modified)
+		patch_cache_control(response, public = True, max_age = 60 * 60)
+		return response
+
+class RobotsTxtView(PrebuiltDocumentView):
+	_document_kind = 'robots.txt'
+	_content_type = 'text/plain; charset=utf-8'
+
+class SitemapXmlView(PrebuiltDocumentView):
+	_document_kind = 'sitemap.xml'
+	_content_type = 'application/xml; charset=utf-8'
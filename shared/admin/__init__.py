@@ -1,2 +1,4 @@
 from .model_registrator import AdminModelRegistrator
 from .singleton_utils 	import make_singleton_model_admin_class
+from .keyset_pagination import KeysetPaginationMixin, KeysetChangeList
+from .counting 			import CachedCountMixin, CachedCountPaginator
@@ -0,0 +1,80 @@
+from functools import cached_property
+from hashlib import sha256
+from typing import Callable
+
+from django.contrib.admin 	import ModelAdmin
+from django.core.exceptions import ImproperlyConfigured
+from django.core.cache 		import cache
+from django.core.paginator 	import Paginator
+
+
+class CachedCountPaginator(Paginator):
+	"""
+	Paginator без `COUNT(*)` по большим таблицам:
+	- пока объектов меньше `exact_count_threshold` - обычный точный подсчёт;
+	- без фильтров - `total_count()` (например, поддерживаемый счётчик);
+	- с фильтрами - точный подсчёт, закэшированный на `cache_timeout` секунд.
+
+	`count_is_exact` - `False`, если количество может быть неточным.
+	"""
+	def __init__(
+			self,
+			object_list,
+			per_page,
+			orphans = 0,
+			allow_empty_first_page = True,
+			*,
+			total_count: Callable[[], int],
+			exact_count_threshold: int = 10_000,
+			cache_timeout: float = 60):
+		super().__init__(object_list, per_page, orphans, allow_empty_first_page)
+		self._total_count = total_count
+		self._exact_count_threshold: int = exact_count_threshold
+		self._cache_timeout: float = cache_timeout
+		self.count_is_exact: bool = True
+
+	@cached_property
+	def count(self) -> int:
+		total = self._total_count()
+		if total < self._exact_count_threshold:
+			return super().count
+
+		self.count_is_exact = False
+		query = self.object_list.query
+		if not query.where and not query.distinct:
+			return total
+
+		cache_key = f"admin-count:{sha256(str(query).encode()).hexdigest()}"
+		count = cache.get(cache_key)
+		if count is None:
+			count = super().count
+			cache.set(cache_key, count, self._cache_timeout)
+		return count
+
+
+class CachedCountMixin:
+	"""
+	Быстрый подсчёт объектов в списке админки (см. `CachedCountPaginator`). Общее количество
+	без фильтров ("N всего") не выводится - это был бы ещё один `COUNT(*)`.
+
+	Attributes:
+		get_total_count: Метод, возвращающий общее количество объектов без фильтров без
+			`COUNT(*)` (например, из счётчика). Обязателен.
+		exact_count_threshold: До скольких объектов считать точно.
+		count_cache_timeout: На сколько секунд кэшировать количество с фильтрами.
+	"""
+	get_total_count: Callable[[], int]
+	exact_count_threshold: int = 10_000
+	count_cache_timeout: float = 60
+	show_full_result_count = False
+
+	def get_paginator(self: ModelAdmin, request, queryset, per_page, orphans = 0, allow_empty_first_page = True):
+		if not callable(getattr(self, 'get_total_count', None)):
+			raise ImproperlyConfigured(f"{type(self).__name__} must define get_total_count() to use CachedCountMixin")
+
+		return CachedCountPaginator(
+			queryset, per_page, orphans, allow_empty_first_page,
+			total_count = self.get_total_count,
+			exact_count_threshold = self.exact_count_threshold,
+			cache_timeout = self.count_cache_timeout,
+		)
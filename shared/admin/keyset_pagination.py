@@ -0,0 +1,114 @@
+from functools import partial
+
+from django.contrib.admin 				import ModelAdmin
+from django.contrib.admin.options 		import IncorrectLookupParameters
+from django.contrib.admin.views.main 	import ChangeList, ORDER_VAR, PAGE_VAR
+from django.core.exceptions 			import ValidationError
+from django.db.models 					import Q, Model
+
+
+AFTER_VAR = 'after'
+BEFORE_VAR = 'before'
+_CURSOR_SEPARATOR = '|'
+
+
+class KeysetChangeList(ChangeList):
+	"""
+	Список объектов с keyset-пагинацией: вместо OFFSET следующая страница выбирается
+	условием `(field, pk) < (последнее значение на странице)`, поэтому любая страница
+	загружается так же быстро, как первая (при индексе по `(field, pk)`).
+
+	Используется при сортировке по умолчанию (`-field, -pk`). Если в списке выбрана
+	другая сортировка или "показать все" - обычная пагинация.
+	"""
+	def __init__(self, request, *args, keyset_field: str, **kwargs):
+		self.keyset_field: str = keyset_field
+		self.keyset_pagination: bool = False
+		self.first_page_url: str | None = None
+		self.previous_page_url: str | None = None
+		self.next_page_url: str | None = None
+		super().__init__(request, *args, **kwargs)
+
+	def get_filters_params(self, params = None):
+		lookup_params = super().get_filters_params(params)
+		lookup_params.pop(AFTER_VAR, None)
+		lookup_params.pop(BEFORE_VAR, None)
+		return lookup_params
+
+	def get_query_string(self, new_params = None, remove = None):
+		# Ссылки фильтров и сортировки ведут на первую страницу
+		new_params = {AFTER_VAR: None, BEFORE_VAR: None, **(new_params or {})}
+		return super().get_query_string(new_params, remove)
+
+	def _encode_cursor(self, obj: Model) -> str:
+		value = self.lookup_opts.get_field(self.keyset_field).value_to_string(obj)
+		return f"{value}{_CURSOR_SEPARATOR}{obj.pk}"
+
+	def _decode_cursor(self, cursor: str) -> tuple:
+		value, _, pk = cursor.rpartition(_CURSOR_SEPARATOR)
+		try:
+			return (
+				self.lookup_opts.get_field(self.keyset_field).to_python(value),
+				self.lookup_opts.pk.to_python(pk),
+			)
+		except ValidationError:
+			raise IncorrectLookupParameters
+
+	def get_results(self, request):
+		super().get_results(request)
+
+		self.keyset_pagination = (
+			self.multi_page
+			and ORDER_VAR not in self.params
+			and not (self.show_all and self.can_show_all)
+		)
+		if not self.keyset_pagination:
+			return
+
+		# Условие `field <= value` отдельно от OR - иначе SQLite не ищет по индексу, а сканирует его
+		field = self.keyset_field
+		queryset = self.queryset
+		after, before = self.params.get(AFTER_VAR), self.params.get(BEFORE_VAR)
+
+		if before:
+			value, pk = self._decode_cursor(before)
+			queryset = queryset.filter(**{f'{field}__gte': value}).filter(Q(**{f'{field}__gt': value}) | Q(pk__gt = pk))
+			queryset = queryset.order_by(field, 'pk')
+		else:
+			if after:
+				value, pk = self._decode_cursor(after)
+				queryset = queryset.filter(**{f'{field}__lte': value}).filter(Q(**{f'{field}__lt': value}) | Q(pk__lt = pk))
+			queryset = queryset.order_by(f'-{field}', '-pk')
+
+		# Лишний объект - признак того, что дальше есть ещё страница
+		result_list = list(queryset[:self.list_per_page + 1])
+		has_more = len(result_list) > self.list_per_page
+		result_list = result_list[:self.list_per_page]
+
+		if before:
+			result_list.reverse()
+			has_previous, has_next = has_more, True
+		else:
+			has_previous, has_next = bool(after), has_more
+
+		self.result_list = result_list
+		if result_list and has_previous:
+			self.first_page_url = self.get_query_string(remove = [PAGE_VAR])
+			self.previous_page_url = self.get_query_string({BEFORE_VAR: self._encode_cursor(result_list[0])})
+		if result_list and has_next:
+			self.next_page_url = self.get_query_string({AFTER_VAR: self._encode_cursor(result_list[-1])})
+
+
+class KeysetPaginationMixin:
+	"""
+	Keyset-пагинация списка в админке (см. `KeysetChangeList`). Для постраничных ссылок
+	нужен шаблон `admin/<app>/<model>/pagination.html`, использующий `cl.first_page_url`,
+	`cl.previous_page_url` и `cl.next_page_url`.
+
+	Attributes:
+		keyset_pagination_field: Поле сортировки по умолчанию (по убыванию), например дата создания.
+	"""
+	keyset_pagination_field: str
+
+	def get_changelist(self: ModelAdmin, request, **kwargs):
+		return partial(KeysetChangeList, keyset_field = self.keyset_pagination_field)
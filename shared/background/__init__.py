@@ -0,0 +1,2 @@
+from .task_queue import BackgroundTaskQueue
+from .batch_writer import BatchWriter
@@ -0,0 +1,128 @@
+from concurrent.futures import Future
+from typing 	import Callable, Generic, TypeVar
+from logging 	import Logger
+from queue 		import Queue, Empty
+import threading, time
+
+from django.db import close_old_connections
+
+
+T = TypeVar('T')
+R = TypeVar('R')
+
+
+class BatchWriter(Generic[T, R]):
+	"""
+	Group commit: объекты из разных потоков (запросов) собираются в пачки, и каждая пачка
+	записывается одним вызовом `flush` (одной транзакцией, одним fsync) в отдельном потоке.
+	Поток запускается лениво, при первой записи.
+
+	Пачка записывается, когда набралось `max_batch_size` объектов, либо через `max_delay`
+	секунд после первого объекта в ней. `write` ждёт, пока пачка с объектом не будет записана.
+	Если записать пачку не удалось - объекты записываются по одному, чтобы ошибка одного
+	не затрагивала остальные, поэтому `flush` должен допускать повторный вызов для тех же
+	объектов (например, сбрасывать то, что заполнил при неудачной попытке).
+
+	Args:
+		name: Название (для потока и логов).
+		flush: Записывает пачку, возвращает результаты в том же порядке.
+		max_batch_size: Максимум объектов в пачке.
+		max_delay: Сколько секунд пачка может ждать новых объектов.
+		logger: Логгер для ошибок записи пачек.
+	"""
+	def __init__(
+			self,
+			name: str,
+			flush: Callable[[list[T]], list[R]],
+			*,
+			max_batch_size: int = 50,
+			max_delay: float = 0.02,
+			logger: Logger | None = None):
+		if max_batch_size < 1:
+			raise ValueError("Max batch size cannot be less 1")
+
+		self._name: str = name
+		self._flush: Callable[[list[T]], list[R]] = flush
+		self._max_batch_size: int = max_batch_size
+		self._max_delay: float = max_delay
+		self._logger: Logger | None = logger
+
+		self._queue: Queue[tuple[T, Future]] = Queue()
+		self._thread: threading.Thread | None = None
+		self._lock = threading.Lock()
+
+	def write(self, item: T, timeout: float | None = None) -> R:
+		"""
+		Args:
+			timeout: Сколько секунд объект может ждать своей пачки в очереди. Если пачка
+				с объектом уже записывается - `write` дожидается окончания записи.
+
+		Returns:
+			Результат `flush` для этого объекта.
+
+		Raises:
+			TimeoutError: Запись объекта не началась за `timeout` секунд - объект снят
+				с записи и не будет записан.
+			Exception: Ошибка записи объекта.
+		"""
+		self._start()
+		future: Future = Future()
+		self._queue.put((item, future))
+		try:
+			return future.result(timeout)
+		except TimeoutError:
+			if future.cancel():
+				raise
+		return future.result()
+
+
+	def _start(self):
+		if self._thread:
+			return
+
+		with self._lock:
+			if self._thread:
+				return
+
+			self._thread = threading.Thread(target = self._work, name = self._name, daemon = True)
+			self._thread.start()
+
+	def _collect_batch(self) -> list[tuple[T, Future]]:
+		batch = [self._queue.get()]
+		deadline = time.monotonic() + self._max_delay
+		while len(batch) < self._max_batch_size:
+			try:
+				batch.append(self._queue.get(timeout = max(deadline - time.monotonic(), 0)))
+			except Empty:
+				break
+		return batch
+
+	def _write_batch(self, batch: list[tuple[T, Future]]):
+		try:
+			results = self._flush([item for item, _ in batch])
+		except Exception as e:
+			if len(batch) == 1:
+				batch[0][1].set_exception(e)
+				return
+
+			if self._logger:
+				self._logger.warning(f'{self._name}: batch of {len(batch)} failed ({e!r}), writing one by one.')
+			for single in batch:
+				self._write_batch([single])
+			return
+
+		for (_, future), result in zip(batch, results):
+			future.set_result(result)
+
+	def _work(self):
+		while True:
+			try:
+				# Объекты, снятые с записи по таймауту в `write`, пропускаются
+				batch = [(item, future) for item, future in self._collect_batch() if future.set_running_or_notify_cancel()]
+				if batch:
+					self._write_batch(batch)
+			except Exception:
+				if self._logger:
+					self._logger.exception(f'{self._name}: unexpected error.')
+			finally:
+				close_old_connections()
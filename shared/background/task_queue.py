@@ -0,0 +1,140 @@
+from typing 	import Callable, Any
+from logging 	import Logger
+from queue 		import Queue, Full, Empty
+import threading, atexit, time
+
+from django.db import close_old_connections
+
+
+class BackgroundTaskQueue:
+	"""
+	Ограниченная очередь задач, выполняемых пулом фоновых потоков внутри процесса.<br>
+	Потоки запускаются лениво, при первой задаче.
+
+	- **Backpressure**: если очередь заполнена, `submit` ждёт освобождения места не дольше
+	`submit_timeout` секунд, после чего задача отклоняется (`submit` вернёт `False`),
+	чтобы не блокировать вызывающий код (обработку запроса) бесконечно.
+	- **Graceful drain**: при завершении процесса (`atexit`) или вызове `shutdown` новые
+	задачи не принимаются, а уже поставленные выполняются, но не дольше `drain_timeout`.
+
+	Args:
+		name: Название очереди (для потоков и логов).
+		workers: Количество потоков.
+		max_size: Максимальное количество ожидающих задач.
+		submit_timeout: Сколько `submit` может ждать места в очереди.
+		drain_timeout: Сколько можно ждать выполнения оставшихся задач при завершении.
+		logger: Логгер для ошибок задач и отклонённых задач.
+	"""
+	_STOP = object()
+
+	def __init__(
+			self,
+			name: str,
+			*,
+			workers: int = 2,
+			max_size: int = 100,
+			submit_timeout: float = 0.5,
+			drain_timeout: float = 10,
+			logger: Logger | None = None):
+		if workers < 1:
+			raise ValueError("Workers count cannot be less 1")
+
+		self._name: str = name
+		self._workers_count: int = workers
+		self._submit_timeout: float = submit_timeout
+		self._drain_timeout: float = drain_timeout
+		self._logger: Logger | None = logger
+
+		self._queue: Queue = Queue(maxsize = max_size)
+		self._threads: list[threading.Thread] = []
+		self._lock = threading.Lock()
+		self._stopped: bool = False
+
+	@property
+	def pending(self) -> int:
+		"""Примерное количество задач, ожидающих выполнения."""
+		return self._queue.qsize()
+
+
+	def submit(self, func: Callable[..., Any], *args, **kwargs) -> bool:
+		"""
+		Ставит задачу в очередь.
+
+		Returns:
+			Принята ли задача. `False` - очередь переполнена или остановлена.
+		"""
+		if self._stopped:
+			self._log_rejected(func, "queue is stopped")
+			return False
+
+		self._start_workers()
+		try:
+			self._queue.put((func, args, kwargs), timeout = self._submit_timeout)
+		except Full:
+			self._log_rejected(func, "queue is full")
+			return False
+
+		return True
+
+	def shutdown(self, timeout: float | None = None):
+		"""Перестаёт принимать задачи и ждёт выполнения уже поставленных (не дольше `timeout`)."""
+		with self._lock:
+			if self._stopped:
+				return
+			self._stopped = True
+
+		deadline = time.monotonic() + (self._drain_timeout if timeout is None else timeout)
+		for _ in self._threads:
+			try:
+				self._queue.put(self._STOP, timeout = max(deadline - time.monotonic(), 0))
+			except Full:
+				break
+
+		for thread in self._threads:
+			thread.join(max(deadline - time.monotonic(), 0))
+
+		if self._logger and (not_done := self._queue.qsize()):
+			self._logger.warning(f'Background queue "{self._name}" stopped with {not_done} unfinished tasks.')
+
+
+	def _start_workers(self):
+		if self._threads:
+			return
+
+		with self._lock:
+			if self._threads:
+				return
+
+			for i in range(self._workers_count):
+				thread = threading.Thread(target = self._work, name = f"{self._name}-{i}", daemon = True)
+				thread.start()
+				self._threads.append(thread)
+
+			atexit.register(self.shutdown)
+
+	def _work(self):
+		while True:
+			try:
+				task = self._queue.get(timeout = 60)
+			except Empty:
+				# Не держим соединение с БД открытым, пока задач нет
+				close_old_connections()
+				continue
+
+			if task is self._STOP:
+				break
+
+			func, args, kwargs = task
+			try:
+				func(*args, **kwargs)
+			except Exception:
+				if self._logger:
+					self._logger.exception(f'Background task {func.__qualname__} failed.')
+			finally:
+				close_old_connections()
+
+		close_old_connections()
+
+	def _log_rejected(self, func: Callable, reason: str):
+		if self._logger:
+			self._logger.error(f'Background task {func.__qualname__} rejected: {reason}.')
@@ -0,0 +1,102 @@
+"""
+Чтение с реплики
+----------------
+`ReadReplicaRouter` направляет чтение моделей из приложений `READ_REPLICA_APPS` на базу
+`READ_REPLICA_DATABASE` (если она есть в `DATABASES`), вся запись - в `default`.
+Для других чтений реплику можно выбрать явно: `queryset.using(get_read_database())`.
+
+Read-your-writes: `ReadReplicaStickinessMiddleware` отслеживает SQL, выполняемый запросом на `default`.
+После первого изменяющего данные запроса (INSERT, UPDATE, DELETE...) чтение до конца
+запроса идёт с `default`, а клиенту ставится cookie, по которой следующие
+`READ_REPLICA_STICKINESS` секунд его запросы тоже читают с `default` - пока реплика не
+догонит основную базу. Метод запроса (POST и т.д.) значения не имеет: например, экспорт
+из админки - POST, но только читает.
+
+Для локальной проверки реплика - копия SQLite файла, которую обновляет
+`manage.py sync_replica`.
+"""
+
+from contextvars import ContextVar
+import time
+
+from django.conf 	import settings
+from django.db 		import DEFAULT_DB_ALIAS, connections
+from django.http 	import HttpRequest, HttpResponse
+
+
+_STICKINESS_COOKIE = 'primary_db_until'
+_READ_ONLY_STATEMENTS = ('SELECT', 'PRAGMA', 'EXPLAIN', 'BEGIN', 'SAVEPOINT', 'RELEASE', 'COMMIT', 'ROLLBACK')
+
+# Запрос (или поток) записывал в БД, либо клиент недавно записывал - читаем с default
+_pinned_to_primary: ContextVar[bool] = ContextVar('pinned_to_primary', default = False)
+_wrote: ContextVar[bool] = ContextVar('wrote', default = False)
+
+
+def _get_replica_alias() -> str | None:
+	alias = getattr(settings, 'READ_REPLICA_DATABASE', 'replica')
+	return alias if alias in settings.DATABASES else None
+
+def get_read_database() -> str:
+	"""База для чтения, которое можно выполнять с реплики."""
+	replica = _get_replica_alias()
+	if replica is None or _pinned_to_primary.get():
+		return DEFAULT_DB_ALIAS
+	return replica
+
+def pin_to_primary():
+	"""Читать с `default` до конца текущего запроса (контекста)."""
+	_pinned_to_primary.set(True)
+
+def _detect_write(execute, sql, params, many, context):
+	# get_or_create (например, get_solo) тоже проходит через db_for_write, поэтому
+	# запись определяется по самому SQL, а не по выбору базы роутером
+	if not sql.lstrip().upper().startswith(_READ_ONLY_STATEMENTS):
+		pin_to_primary()
+		_wrote.set(True)
+	return execute(sql, params, many, context)
+
+
+class ReadReplicaRouter:
+	def db_for_read(self, model, **hints) -> str | None:
+		if model._meta.app_label in getattr(settings, 'READ_REPLICA_APPS', ()):
+			return get_read_database()
+		return DEFAULT_DB_ALIAS
+
+	def db_for_write(self, model, **hints) -> str:
+		return DEFAULT_DB_ALIAS
+
+	def allow_relation(self, obj1, obj2, **hints) -> bool:
+		# Реплика - копия default, объекты с обеих баз ссылаются на одни и те же строки
+		return True
+
+	def allow_migrate(self, db: str, app_label: str, **hints) -> bool:
+		# Схема попадает на реплику вместе с данными
+		return db != _get_replica_alias()
+
+
+class ReadReplicaStickinessMiddleware:
+	def __init__(self, get_response):
+		self.get_response = get_response
+
+	def __call__(self, request: HttpRequest) -> HttpResponse:
+		if _get_replica_alias() is None:
+			return self.get_response(request)
+
+		pinned_until = request.COOKIES.get(_STICKINESS_COOKIE, '')
+		pinned_token = _pinned_to_primary.set(pinned_until.isdigit() and int(pinned_until) > time.time())
+		wrote_token = _wrote.set(False)
+		try:
+			with connections[DEFAULT_DB_ALIAS].execute_wrapper(_detect_write):
+				response = self.get_response(request)
+			wrote = _wrote.get()
+		finally:
+			_pinned_to_primary.reset(pinned_token)
+			_wrote.reset(wrote_token)
+
+		if wrote:
+			stickiness = getattr(settings, 'READ_REPLICA_STICKINESS', 5)
+			response.set_cookie(
+				_STICKINESS_COOKIE, str(int(time.time() + stickiness) + 1),
+				max_age = stickiness + 1, httponly = True, samesite = 'Lax',
+			)
+		return response
@@ -0,0 +1 @@
+from .derivatives import DerivativeSpec, register_derivative_spec, get_derivative_url, generate_derivatives, delete_derivatives
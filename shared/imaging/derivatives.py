@@ -0,0 +1,206 @@
+"""
+Производные изображения (ресайз + перекодирование) для загруженных `ImageField`
+-------------------------------------------------------------------------------
+Исходник не меняется: для каждой зарегистрированной спецификации рядом в хранилище
+создаётся уменьшенная и пережатая копия. Копии кешируются на диске в папке
+`derivatives/<sha256 исходника>/`, поэтому повторная загрузка того же файла
+не приводит к повторной генерации, а замена файла - к использованию устаревшей копии.
+
+Генерировать копии можно заранее (`generate_derivatives`, обычно при сохранении
+модели), либо лениво при первом обращении (`get_derivative_url`, используется в
+шаблонном теге `derivative_url`).
+
+Удаление копий при замене/удалении исходника (`delete_derivatives`) подключено
+к сигналу `cleanup_pre_delete` от `django_cleanup` в `content/signals.py`.
+"""
+
+from dataclasses	import dataclass
+from hashlib 		import sha256
+from threading 		import Lock
+from io 			import BytesIO
+import logging
+
+from django.core.files.base 		import ContentFile
+from django.db.models.fields.files 	import FieldFile
+
+from PIL import Image, ImageOps, UnidentifiedImageError
+
+
+_logger = logging.getLogger(__name__)
+
+DERIVATIVES_FOLDER = 'derivatives'
+_HASH_CHUNK_SIZE = 64 * 1024
+
+@dataclass(frozen = True)
+class DerivativeSpec:
+	"""
+	Описание производного изображения.
+
+	Args:
+		size: Максимальные (ширина, высота). Если `crop` - изображение будет
+			обрезано точно под размер, иначе вписано с сохранением пропорций.
+			`None` - без изменения размера (только перекодирование).
+		format: Формат Pillow (`PNG`, `WEBP`, `JPEG`...).
+		quality: Качество для форматов с потерями.
+		crop: Обрезать ли по центру под точный размер.
+	"""
+	size: tuple[int, int] | None
+	format: str = 'WEBP'
+	quality: int = 80
+	crop: bool = False
+
+	@property
+	def extension(self) -> str:
+		return 'jpg' if self.format == 'JPEG' else self.format.lower()
+
+
+_specs: dict[str, DerivativeSpec] = {
+	'favicon_16': DerivativeSpec((16, 16), format = 'PNG', crop = True),
+	'favicon_32': DerivativeSpec((32, 32), format = 'PNG', crop = True),
+	'apple_touch_icon': DerivativeSpec((180, 180), format = 'PNG', crop = True),
+	'webp': DerivativeSpec(None),
+	'webp_1280': DerivativeSpec((1280, 1280)),
+}
+
+# (имя файла, время изменения) -> sha256, чтобы не перечитывать исходник на каждый запрос
+_source_hashes: dict[tuple[str, float], str] = {}
+_generation_lock = Lock()
+
+
+def register_derivative_spec(name: str, spec: DerivativeSpec):
+	"""
+	Регистрирует новую спецификацию производного изображения.
+
+	Raises:
+		RuntimeError: Спецификация с таким именем уже зарегистрирована.
+	"""
+	if name in _specs:
+		raise RuntimeError(f"Derivative spec {name} already registered.")
+	_specs[name] = spec
+
+def get_derivative_spec(name: str) -> DerivativeSpec:
+	"""
+	Raises:
+		KeyError: Спецификация не зарегистрирована.
+	"""
+	try:
+		return _specs[name]
+	except KeyError:
+		raise KeyError(f"Unknown derivative spec {name}") from None
+
+
+def get_source_hash(field_file: FieldFile) -> str:
+	"""Возвращает sha256 содержимого исходного файла (с кешированием в памяти процесса)."""
+	storage = field_file.storage
+	try:
+		modified = storage.get_modified_time(field_file.name).timestamp()
+	except NotImplementedError:
+		modified = 0.0
+
+	key = (field_file.name, modified)
+	if key in _source_hashes:
+		return _source_hashes[key]
+
+	digest = sha256()
+	with storage.open(field_file.name, 'rb') as source:
+		for chunk in iter(lambda: source.read(_HASH_CHUNK_SIZE), b''):
+			digest.update(chunk)
+
+	_source_hashes[key] = digest.hexdigest()
+	return _source_hashes[key]
+
+def get_derivative_name(source_hash: str, spec_name: str) -> str:
+	spec = get_derivative_spec(spec_name)
+	return f"{DERIVATIVES_FOLDER}/{source_hash}/{spec_name}.{spec.extension}"
+
+
+def _render(field_file: FieldFile, spec: DerivativeSpec) -> bytes:
+	with field_file.storage.open(field_file.name, 'rb') as source, Image.open(source) as image:
+		image = ImageOps.exif_transpose(image)
+
+		# JPEG не поддерживает прозрачность, остальные форматы - сохраняем её
+		if spec.format == 'JPEG':
+			image = image.convert('RGB')
+		elif image.mode not in ('RGB', 'RGBA'):
+			image = image.convert('RGBA')
+
+		if spec.size and spec.crop:
+			image = ImageOps.fit(image, spec.size, Image.Resampling.LANCZOS)
+		elif spec.size:
+			image.thumbnail(spec.size, Image.Resampling.LANCZOS)
+
+		buffer = BytesIO()
+		image.save(buffer, spec.format, quality = spec.quality, optimize = True)
+		return buffer.getvalue()
+
+def _ensure_derivative(field_file: FieldFile, spec_name: str) -> str:
+	storage = field_file.storage
+	name = get_derivative_name(get_source_hash(field_file), spec_name)
+
+	if storage.exists(name):
+		return name
+
+	with _generation_lock:
+		# Могли сгенерировать, пока ждали блокировку
+		if storage.exists(name):
+			return name
+
+		saved_name = storage.save(name, ContentFile(_render(field_file, get_derivative_spec(spec_name))))
+		# Другой процесс успел раньше - хранилище выдало свободное имя, лишняя копия не нужна
+		if saved_name != name:
+			storage.delete(saved_name)
+
+		_logger.debug(f'Derivative "{spec_name}" generated for {field_file.name}')
+
+	return name
+
+
+def get_derivative_url(field_file: FieldFile, spec_name: str) -> str:
+	"""
+	Возвращает URL производного изображения, при необходимости генерируя его.
+	Если файла нет - пустую строку, если изображение не удалось обработать -
+	URL исходника (страница не должна падать из-за картинки).
+	"""
+	if not field_file:
+		return ''
+
+	try:
+		return field_file.storage.url(_ensure_derivative(field_file, spec_name))
+	except (OSError, UnidentifiedImageError):
+		_logger.exception(f'Failed to generate derivative "{spec_name}" for {field_file.name}')
+		return field_file.url
+
+def generate_derivatives(field_file: FieldFile, spec_names: tuple[str, ...] | None = None):
+	"""
+	Заранее генерирует производные изображения (по умолчанию - по всем спецификациям).
+	Ошибки логгируются, но не пробрасываются: сохранение модели не должно от этого падать.
+	"""
+	if not field_file:
+		return
+
+	for spec_name in spec_names or tuple(_specs):
+		try:
+			_ensure_derivative(field_file, spec_name)
+		except (OSError, UnidentifiedImageError):
+			_logger.exception(f'Failed to generate derivative "{spec_name}" for {field_file.name}')
+
+def delete_derivatives(field_file: FieldFile):
+	"""Удаляет все производные изображения исходника. Исходник должен ещё существовать."""
+	if not field_file or not field_file.storage.exists(field_file.name):
+		return
+
+	storage = field_file.storage
+	source_hash = get_source_hash(field_file)
+	folder = f"{DERIVATIVES_FOLDER}/{source_hash}"
+
+	try:
+		_, files = storage.listdir(folder)
+	except FileNotFoundError:
+		return
+
+	for file_name in files:
+		storage.delete(f"{folder}/{file_name}")
+
+	for key, value in list(_source_hashes.items()):
+		if value == source_hash:
+			del _source_hashes[key]
@@ -0,0 +1,84 @@
+from abc 		import ABC, abstractmethod
+from threading 	import Lock
+import time
+
+from django.core.cache import caches
+
+from .token_bucket import TokenBucket
+
+
+class KeyedRateLimiter(ABC):
+	"""
+	Не больше `limit` действий за `period` секунд на каждый ключ (IP, номер телефона и т.п.).
+	"""
+	def __init__(self, limit: int, period: float):
+		if limit < 1 or period <= 0:
+			raise ValueError("Limit cannot be less 1 and period must be positive")
+
+		self.limit: int = limit
+		self.period: float = period
+
+	@abstractmethod
+	def hit(self, key: str) -> float:
+		"""
+		Засчитывает действие.
+
+		Returns:
+			0, если действие разрешено, иначе - через сколько секунд повторить.
+		"""
+
+
+class MemoryRateLimiter(KeyedRateLimiter):
+	"""
+	Token bucket на каждый ключ в памяти процесса: допускает всплеск до `limit` действий,
+	дальше - не чаще `limit / period` в секунду. При нескольких процессах у каждого свой лимит.
+	"""
+	def __init__(self, limit: int, period: float, *, max_keys: int = 10_000):
+		super().__init__(limit, period)
+		self._max_keys: int = max_keys
+		self._buckets: dict[str, TokenBucket] = {}
+		self._lock = Lock()
+
+	def _get_bucket(self, key: str) -> TokenBucket:
+		with self._lock:
+			if bucket := self._buckets.get(key):
+				return bucket
+
+			if len(self._buckets) >= self._max_keys:
+				self._buckets = {key: bucket for key, bucket in self._buckets.items() if not bucket.idle}
+
+			bucket = self._buckets[key] = TokenBucket(self.limit / self.period, self.limit)
+			return bucket
+
+	def hit(self, key: str) -> float:
+		if self._get_bucket(key).try_acquire():
+			return 0
+		return self.period / self.limit
+
+
+class CacheRateLimiter(KeyedRateLimiter):
+	"""
+	Фиксированное окно в кэше Django - лимит общий для всех процессов, если кэш общий (Redis, БД).
+	"""
+	def __init__(self, limit: int, period: float, *, prefix: str, cache_alias: str = 'default'):
+		super().__init__(limit, period)
+		self._prefix: str = prefix
+		self._cache_alias: str = cache_alias
+
+	def hit(self, key: str) -> float:
+		cache = caches[self._cache_alias]
+		now = time.time()
+		window = int(now // self.period)
+		cache_key = f"{self._prefix}:{key}:{window}"
+
+		cache.add(cache_key, 0, self.period)
+		try:
+			count = cache.incr(cache_key)
+		except ValueError:
+			# Ключ успел устареть между add и incr
+			cache.add(cache_key, 1, self.period)
+			count = 1
+
+		if count <= self.limit:
+			return 0
+		return (window + 1) * self.period - now
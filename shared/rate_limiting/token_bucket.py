@@ -0,0 +1,73 @@
+from threading import Lock
+import time
+
+
+class TokenBucket:
+	"""
+	Потокобезопасный token bucket: `capacity` токенов, пополняется со скоростью
+	`rate` токенов в секунду.
+
+	Args:
+		rate: Токенов в секунду.
+		capacity: Размер "всплеска" - сколько токенов можно потратить разом.
+	"""
+	def __init__(self, rate: float, capacity: float):
+		if rate <= 0 or capacity < 1:
+			raise ValueError("Rate must be positive and capacity cannot be less 1")
+
+		self._rate: float = rate
+		self._capacity: float = capacity
+		self._tokens: float = capacity
+		self._updated_at: float = time.monotonic()
+		self._blocked_until: float = 0
+		self._lock = Lock()
+
+	def _refill(self, now: float):
+		self._tokens = min(self._capacity, self._tokens + (now - self._updated_at) * self._rate)
+		self._updated_at = now
+
+	def reserve(self, tokens: float = 1) -> float:
+		"""
+		Резервирует токены, даже если их пока не хватает (баланс уходит в минус).
+
+		Returns:
+			Сколько секунд нужно подождать, прежде чем действие будет разрешено.
+		"""
+		with self._lock:
+			now = time.monotonic()
+			self._refill(now)
+			self._tokens -= tokens
+
+			wait = max(self._blocked_until - now, 0)
+			if self._tokens < 0:
+				wait = max(wait, -self._tokens / self._rate)
+			return wait
+
+	def release(self, tokens: float = 1):
+		"""Возвращает зарезервированные, но не использованные токены."""
+		with self._lock:
+			self._tokens = min(self._capacity, self._tokens + tokens)
+
+	def try_acquire(self, tokens: float = 1) -> bool:
+		"""Забирает токены, только если они есть прямо сейчас."""
+		with self._lock:
+			now = time.monotonic()
+			self._refill(now)
+			if now < self._blocked_until or self._tokens < tokens:
+				return False
+
+			self._tokens -= tokens
+			return True
+
+	def block_for(self, seconds: float):
+		"""Запрещает действия на `seconds` секунд (например, по `retry_after` от внешнего API)."""
+		with self._lock:
+			self._blocked_until = max(self._blocked_until, time.monotonic() + seconds)
+
+	@property
+	def idle(self) -> bool:
+		"""Bucket полон и не заблокирован - его можно не хранить."""
+		with self._lock:
+			now = time.monotonic()
+			self._refill(now)
+			return self._tokens >= self._capacity and now >= self._blocked_until
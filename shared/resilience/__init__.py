@@ -0,0 +1 @@
+from .circuit_breaker import CircuitBreaker, CircuitState
@@ -0,0 +1,104 @@
+from enum 		import Enum
+from threading 	import Lock
+import time
+
+
+class CircuitState(Enum):
+	CLOSED = 'closed'
+	OPEN = 'open'
+	HALF_OPEN = 'half_open'
+
+
+class CircuitBreaker:
+	"""
+	Потокобезопасный circuit breaker.
+
+	- **CLOSED** - вызовы разрешены. После `failure_threshold` ошибок подряд - **OPEN**.
+	- **OPEN** - вызовы сразу отклоняются, не дожидаясь таймаутов недоступного сервиса.
+	Через `recovery_timeout` секунд - **HALF_OPEN**.
+	- **HALF_OPEN** - разрешено не более `half_open_max_calls` пробных вызовов одновременно.
+	Успешный пробный вызов - **CLOSED**, ошибка - снова **OPEN**.
+
+	Пример:
+	```
+	if not breaker.allow_request():
+		raise ... # отложить, повторить через breaker.retry_after
+	try:
+		call()
+	except Error:
+		breaker.record_failure()
+		raise
+	breaker.record_success()
+	```
+	"""
+	def __init__(self, *, failure_threshold: int = 5, recovery_timeout: float = 30, half_open_max_calls: int = 1):
+		if failure_threshold < 1 or half_open_max_calls < 1:
+			raise ValueError("Failure threshold and half-open max calls cannot be less 1")
+
+		self._failure_threshold: int = failure_threshold
+		self._recovery_timeout: float = recovery_timeout
+		self._half_open_max_calls: int = half_open_max_calls
+
+		self._state: CircuitState = CircuitState.CLOSED
+		self._failures: int = 0
+		self._opened_at: float = 0
+		self._half_open_calls: int = 0
+		self._lock = Lock()
+
+	def _update_state(self, now: float):
+		if self._state is CircuitState.OPEN and now - self._opened_at >= self._recovery_timeout:
+			self._state = CircuitState.HALF_OPEN
+			self._half_open_calls = 0
+
+	def _open(self, now: float):
+		self._state = CircuitState.OPEN
+		self._opened_at = now
+		self._failures = 0
+
+	@property
+	def state(self) -> CircuitState:
+		with self._lock:
+			self._update_state(time.monotonic())
+			return self._state
+
+	@property
+	def retry_after(self) -> float:
+		"""Через сколько секунд будут разрешены вызовы (0 - уже разрешены)."""
+		with self._lock:
+			if self._state is not CircuitState.OPEN:
+				return 0
+			return max(self._opened_at + self._recovery_timeout - time.monotonic(), 0)
+
+	def allow_request(self) -> bool:
+		with self._lock:
+			self._update_state(time.monotonic())
+
+			if self._state is CircuitState.CLOSED:
+				return True
+			if self._state is CircuitState.HALF_OPEN and self._half_open_calls < self._half_open_max_calls:
+				self._half_open_calls += 1
+				return True
+			return False
+
+	def record_success(self):
+		with self._lock:
+			self._state = CircuitState.CLOSED
+			self._failures = 0
+
+	def record_failure(self):
+		with self._lock:
+			now = time.monotonic()
+			self._update_state(now)
+
+			if self._state is CircuitState.HALF_OPEN:
+				self._open(now)
+				return
+
+			self._failures += 1
+			if self._failures >= self._failure_threshold:
+				self._open(now)
+
+	def trip(self):
+		"""Принудительно размыкает цепь (например, если сервис заведомо недоступен)."""
+		with self._lock:
+			self._open(time.monotonic())
@@ -0,0 +1 @@
+from .prefix_index import PrefixIndex, normalize
@@ -0,0 +1,114 @@
+from bisect 	import bisect_left, insort
+from threading 	import Lock
+import re
+
+
+_SPACES_PATTERN = re.compile(r'\s+')
+
+def normalize(value: str) -> str:
+	"""Ключ для сравнения строк: без регистра, лишних пробелов, "ё" = "е"."""
+	return _SPACES_PATTERN.sub(' ', value.strip().casefold().replace('ё', 'е'))
+
+
+class PrefixIndex:
+	"""
+	Поиск строк по началу (для автодополнения) в памяти: отсортированный список ключей
+	(`normalize`) и `bisect` - O(log n) на поиск начала диапазона, без запросов к БД.
+
+	У каждой строки есть вес (например, сколько раз её вводили), в результатах сначала
+	строки с большим весом. Одинаковые по ключу строки ("Москва", " москва") - одна запись
+	с суммарным весом. Показывается вариант написания с наибольшим весом, а добавленный
+	с `canonical = True` (например, из справочника) - всегда.
+
+	Под короткими префиксами (до `top_prefix_length` символов) подходящих строк может быть
+	слишком много, чтобы просматривать их при каждом поиске, - для них хранятся `top_size`
+	строк с наибольшим весом. Для длинных префиксов просматривается не больше `max_scan`
+	подходящих строк (по алфавиту).
+	"""
+	def __init__(self, *, top_prefix_length: int = 3, top_size: int = 20, max_scan: int = 200):
+		self._top_prefix_length: int = top_prefix_length
+		self._top_size: int = top_size
+		self._max_scan: int = max_scan
+
+		self._keys: list[str] = []
+		self._values: dict[str, str] = {}
+		self._weights: dict[str, int] = {}
+		# Веса вариантов написания - для выбора показываемого
+		self._spellings: dict[str, dict[str, int]] = {}
+		self._canonical: set[str] = set()
+		# Короткий префикс -> ключи с наибольшим весом, по убыванию веса
+		self._top: dict[str, list[str]] = {}
+		self._lock = Lock()
+
+	def __len__(self) -> int:
+		return len(self._keys)
+
+	def add(self, value: str, weight: int = 1, *, canonical: bool = False):
+		"""Добавляет строку, либо увеличивает её вес, если она уже есть."""
+		key = normalize(value)
+		if not key:
+			return
+
+		value = ' '.join(value.split())
+		with self._lock:
+			is_new = key not in self._weights
+			self._weights[key] = self._weights.get(key, 0) + weight
+
+			spellings = self._spellings.setdefault(key, {})
+			spellings[value] = spellings.get(value, 0) + weight
+			if canonical:
+				self._canonical.add(key)
+				self._values[key] = value
+			elif key not in self._canonical:
+				self._values[key] = max(spellings, key = spellings.__getitem__)
+
+			self._update_top(key)
+			if is_new:
+				# Последним - поиск без блокировки видит ключ только со значением и весом
+				insort(self._keys, key)
+
+	def _update_top(self, key: str):
+		weight = self._weights[key]
+		for length in range(1, min(len(key), self._top_prefix_length) + 1):
+			top = self._top.get(key[:length], [])
+			if key not in top:
+				if len(top) >= self._top_size and self._weights[top[-1]] >= weight:
+					continue
+				top = top + [key]
+
+			# Новый список вместо изменения старого - для поиска без блокировки
+			top = sorted(top, key = lambda top_key: (-self._weights[top_key], top_key))[:self._top_size]
+			self._top[key[:length]] = top
+
+	def get(self, value: str) -> str | None:
+		"""Вариант написания из индекса для строки, `None` - если её нет в индексе."""
+		return self._values.get(normalize(value))
+
+	def get_weight(self, value: str) -> int:
+		return self._weights.get(normalize(value), 0)
+
+	def search(self, prefix: str, limit: int = 10, *, min_weight: int = 0) -> list[str]:
+		"""
+		Строки, начинающиеся с `prefix`, по убыванию веса (при равном - по алфавиту).
+
+		Args:
+			min_weight: Не показывать строки с меньшим весом.
+		"""
+		prefix = normalize(prefix)
+		if not prefix:
+			return []
+
+		if len(prefix) <= self._top_prefix_length:
+			matches = self._top.get(prefix, [])
+		else:
+			# Без блокировки: список только растёт, а вставка в него атомарна
+			keys = self._keys
+			start = bisect_left(keys, prefix)
+			matches = []
+			for key in keys[start:start + self._max_scan]:
+				if not key.startswith(prefix):
+					break
+				matches.append(key)
+			matches.sort(key = lambda key: (-self._weights[key], key))
+
+		return [self._values[key] for key in matches if self._weights[key] >= min_weight][:limit]